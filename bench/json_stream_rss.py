@@ -0,0 +1,106 @@
+"""
+Peak RSS of the processor's row pipeline, streaming vs. json.loads, by row count.
+
+Each measurement runs in a fresh subprocess so ru_maxrss is not shared
+between sizes. S3 is replaced by a local file for reads and a sink that
+discards uploaded bytes for writes.
+
+    python bench/json_stream_rss.py --rows 1000 10000 100000 1000000
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lambdas"))
+
+from json_stream import iter_json_array, S3JsonArrayWriter
+
+REQUIRED_COLUMNS = ["Symbol", "Open", "High", "Low", "Close", "LTP", "Vol", "Turnover", "Diff %"]
+COLUMN_INDICES = [1, 3, 4, 5, 6, 7, 11, 13, 17]
+
+
+class _DiscardS3:
+    def put_object(self, **kwargs):
+        pass
+
+    def create_multipart_upload(self, **kwargs):
+        return {"UploadId": "bench"}
+
+    def upload_part(self, **kwargs):
+        return {"ETag": "bench"}
+
+    def complete_multipart_upload(self, **kwargs):
+        pass
+
+    def abort_multipart_upload(self, **kwargs):
+        pass
+
+
+def _write_raw_file(path, rows):
+    rng = random.Random(rows)
+    with open(path, "w") as f:
+        f.write("[")
+        for i in range(rows):
+            close = round(rng.uniform(5, 2000), 2)
+            row = [float(i + 1), f"SYM{i}"] + [round(close * rng.uniform(0.9, 1.1), 2) for _ in range(22)]
+            f.write(("," if i else "") + "\n" + json.dumps(row))
+        f.write("\n]")
+
+
+def _transform(row):
+    filtered_row = {col: row[idx] for col, idx in zip(REQUIRED_COLUMNS, COLUMN_INDICES)}
+    if float(filtered_row["Close"]) < 20:
+        return None
+    return {k: str(v) if isinstance(v, (int, float)) else v for k, v in filtered_row.items()}
+
+
+def _run(path, mode):
+    if mode == "stream":
+        with open(path, "rb") as f, S3JsonArrayWriter(_DiscardS3(), "bench", "bench") as writer:
+            for row in iter_json_array(f):
+                out = _transform(row)
+                if out is not None:
+                    writer.write(out)
+    else:
+        with open(path, "rb") as f:
+            raw_data = json.loads(f.read())
+        processed = [out for out in map(_transform, raw_data) if out is not None]
+        json.dumps(processed, indent=2)
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000, 1000000])
+    parser.add_argument("--modes", nargs="+", default=["stream", "eager"], choices=["stream", "eager"])
+    parser.add_argument("--child", nargs=2, metavar=("PATH", "MODE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(_run(*args.child))
+        return
+
+    print(f"{'rows':>10} {'file MB':>8} " + " ".join(f"{m + ' MB':>10}" for m in args.modes))
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            path = os.path.join(tmp, f"raw_{rows}.json")
+            _write_raw_file(path, rows)
+            peaks = []
+            for mode in args.modes:
+                out = subprocess.run(
+                    [sys.executable, __file__, "--child", path, mode],
+                    check=True, capture_output=True, text=True
+                )
+                peaks.append(float(out.stdout))
+            size_mb = os.path.getsize(path) / 1024 / 1024
+            print(f"{rows:>10} {size_mb:>8.1f} " + " ".join(f"{p:>10.1f}" for p in peaks))
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
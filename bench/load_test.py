@@ -0,0 +1,214 @@
+"""
+Local load test: replays synthetic market data through the Lambda handlers.
+
+For each scale, --days synthetic trading days are generated and pushed, in
+order, through scraper (HTML parse), processor, llm_analysis (prompt build;
+Bedrock is replaced by a canned response) and notifier (email rendering; SES
+is replaced by a no-op). S3 and the idempotency ledger are in-memory and
+shared by all days of a scale, so the reject index and dedup state carry
+over from one day to the next. Each stage is timed on one replay and
+measured under tracemalloc for its peak allocation on a second one.
+
+    python bench/load_test.py --symbols 320 3200 32000
+    python bench/load_test.py --symbols 3200 --days 5
+    python bench/load_test.py --symbols 3200 --missing-rate 0.05 --garbage-rate 0.05 --low-price-share 0.5
+
+The scraper stage needs requests and beautifulsoup4 (the scraper layer's
+dependencies); it is reported as skipped when they are not installed.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+from unittest.mock import MagicMock, patch
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, "lambdas"))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("BUCKET_NAME", "load-test")
+os.environ.setdefault("DYNAMO_TABLE", "load-test")
+os.environ.setdefault("SES_EMAIL_FROM", "from@example.com")
+os.environ.setdefault("SES_EMAIL_TO", "to@example.com")
+os.environ.pop("LEDGER_TABLE", None)  # use the in-memory ledger
+
+import llm_analysis_lambda
+import notifier_lambda
+import processor_lambda
+from idempotency import LocalLedger
+from memory_s3 import MemoryS3
+from synthetic_data import generate_days, render_html
+
+try:
+    import scraper_lambda
+except ImportError:
+    scraper_lambda = None
+
+CANNED_ANALYSIS = """MARKET SUMMARY
+Synthetic session for load testing.
+
+ANOMALIES
+Symbol: SYN00001, Turnover: 1000000.0, Price Change: +5.00%, Reason: Synthetic spike.
+Symbol: SYN00002, Turnover: 2000000.0, Price Change: -4.00%, Reason: Synthetic drop.
+
+SUGGESTIONS
+Opportunity: Synthetic opportunity.
+Risk: Synthetic risk.
+"""
+
+
+class _Context:
+    aws_request_id = "load-test"
+
+    def get_remaining_time_in_millis(self):
+        return 15 * 60 * 1000
+
+
+def _wire_clients(s3, ledger):
+    bedrock = MagicMock()
+    bedrock.invoke_model.side_effect = lambda **kwargs: {"body": io.BytesIO(json.dumps(
+        {"output": {"message": {"content": [{"text": CANNED_ANALYSIS}]}}}
+    ).encode("utf-8"))}
+    ses = MagicMock()
+    ses.send_email.return_value = {"MessageId": "load-test"}
+    events = MagicMock()
+
+    processor_lambda.s3 = s3
+    llm_analysis_lambda.s3 = s3
+    llm_analysis_lambda.bedrock = bedrock
+    llm_analysis_lambda.dynamodb = MagicMock()
+    llm_analysis_lambda.events = events
+    llm_analysis_lambda.ALERT_EVENT_BUS = "load-test"
+    notifier_lambda.s3 = s3
+    notifier_lambda.ses = ses
+    notifier_lambda.BUCKET_NAME = os.environ["BUCKET_NAME"]
+    if scraper_lambda is not None:
+        scraper_lambda.s3 = s3
+    for module in (processor_lambda, llm_analysis_lambda, notifier_lambda, scraper_lambda):
+        if module is not None:
+            module.get_ledger = lambda: ledger
+    return bedrock, events, ses
+
+
+def _s3_event(key):
+    return {"Records": [{"s3": {"object": {"key": key}}}]}
+
+
+def _run_pipeline(s3, ledger, day, rows, page, run_id):
+    """Run every stage once for one day (handler logs discarded); return {stage: (seconds, result)}."""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        return _run_stages(s3, ledger, day, rows, page, run_id)
+
+
+def _run_stages(s3, ledger, day, rows, page, run_id):
+    bedrock, events, ses = _wire_clients(s3, ledger)
+    timings = {}
+
+    if scraper_lambda is not None:
+        response = MagicMock(text=page)
+        with patch.object(scraper_lambda.requests, "get", return_value=response):
+            start = time.perf_counter()
+            result = scraper_lambda.lambda_handler({"id": f"{run_id}_{day}"}, _Context())
+            timings["scraper"] = (time.perf_counter() - start, result)
+
+    # Processor input is the generated rows, so every stage sees the same data
+    raw_key = f"raw/{day}/data_{run_id}.json"
+    s3.put_object(Bucket="", Key=raw_key, Body=json.dumps(rows, indent=2))
+    start = time.perf_counter()
+    result = processor_lambda.lambda_handler(_s3_event(raw_key), _Context())
+    timings["processor"] = (time.perf_counter() - start, result)
+
+    start = time.perf_counter()
+    result = llm_analysis_lambda.lambda_handler(_s3_event(result["processed_file"]), _Context())
+    timings["llm_analysis"] = (time.perf_counter() - start, result)
+
+    detail = json.loads(events.put_events.call_args.kwargs["Entries"][0]["Detail"])
+    start = time.perf_counter()
+    result = notifier_lambda.lambda_handler({"detail": detail}, _Context())
+    timings["notifier"] = (time.perf_counter() - start, result)
+    html_bytes = len(ses.send_email.call_args.kwargs["Message"]["Body"]["Html"]["Data"])
+
+    prompt = json.loads(bedrock.invoke_model.call_args.kwargs["body"])["messages"][0]["content"][0]["text"]
+    return timings, {"prompt_chars": len(prompt), "email_bytes": html_bytes}
+
+
+def _peak_memory(s3, ledger, day, rows, page, run_id):
+    """Per-stage peak traced allocation in MB, measured on a separate run."""
+    peaks = {}
+    original = {}
+    stages = {"processor": processor_lambda, "llm_analysis": llm_analysis_lambda, "notifier": notifier_lambda}
+    if scraper_lambda is not None:
+        stages["scraper"] = scraper_lambda
+
+    def traced(name, handler):
+        def wrapper(*args, **kwargs):
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            try:
+                return handler(*args, **kwargs)
+            finally:
+                peaks[name] = (tracemalloc.get_traced_memory()[1] - base) / 1024 / 1024
+        return wrapper
+
+    tracemalloc.start()
+    try:
+        for name, module in stages.items():
+            original[name] = module.lambda_handler
+            module.lambda_handler = traced(name, module.lambda_handler)
+        _run_pipeline(s3, ledger, day, rows, page, run_id)
+    finally:
+        for name, module in stages.items():
+            module.lambda_handler = original[name]
+        tracemalloc.stop()
+    return peaks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, nargs="+", default=[320, 3200, 32000])
+    parser.add_argument("--days", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--missing-rate", type=float, default=0.0)
+    parser.add_argument("--garbage-rate", type=float, default=0.0)
+    parser.add_argument("--low-price-share", type=float, default=None)
+    args = parser.parse_args()
+
+    if scraper_lambda is None:
+        print("scraper: skipped (requests / beautifulsoup4 not installed)")
+
+    print(f"{'symbols':>8} {'day':<10} {'stage':<13} {'seconds':>8} {'rows/s':>10} {'peak MB':>8}  notes")
+    for n_symbols in args.symbols:
+        # One store and ledger per replay, shared by all of its days
+        timed = (MemoryS3(), LocalLedger())
+        traced = (MemoryS3(), LocalLedger())
+
+        for day, rows in generate_days(n_symbols, args.days, args.seed, missing_rate=args.missing_rate,
+                                       garbage_rate=args.garbage_rate, low_price_share=args.low_price_share):
+            page = render_html(rows)
+            timings, sizes = _run_pipeline(*timed, day, rows, page, f"{n_symbols}_timed")
+            peaks = _peak_memory(*traced, day, rows, page, f"{n_symbols}_traced")
+
+            for stage, (seconds, result) in timings.items():
+                notes = ""
+                if stage == "processor":
+                    known = result.get("known_rejected", {})
+                    notes = (f"processed={result.get('processed_count')} rejected={result.get('rejected_count')} "
+                             f"novel={result.get('novel_rejected_count')} known={known.get('count')} delta={known.get('delta')}")
+                elif stage == "llm_analysis":
+                    notes = f"prompt={sizes['prompt_chars']:,} chars"
+                elif stage == "notifier":
+                    notes = f"email={sizes['email_bytes']:,} bytes"
+                if result.get("status") in ("error", "duplicate"):
+                    notes = f"{result['status'].upper()}: {result.get('message', '')}".rstrip(": ")
+                # The notifier renders one email, not rows
+                rate = "-" if stage == "notifier" else f"{len(rows) / seconds if seconds else float('inf'):,.0f}"
+                print(f"{n_symbols:>8} {day!s:<10} {stage:<13} {seconds:>8.3f} {rate:>10} {peaks.get(stage, 0):>8.1f}  {notes}")
+
+
+if __name__ == "__main__":
+    main()
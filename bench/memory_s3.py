@@ -0,0 +1,61 @@
+"""
+In-memory stand-in for the S3 client, shared by the load test and the unit tests.
+
+Covers the subset of the API the handlers use, including the multipart
+upload calls made by json_stream.S3JsonArrayWriter.
+"""
+import hashlib
+import io
+import uuid
+
+
+class MemoryS3:
+    """The subset of the S3 client API used by the handlers, backed by a dict."""
+
+    class exceptions:
+        class NoSuchKey(Exception):
+            pass
+
+    def __init__(self):
+        self.objects = {}
+        # Keys written, in order (put, copy or completed multipart upload)
+        self.puts = []
+        self._uploads = {}
+
+    def _store(self, key, body):
+        self.puts.append(key)
+        self.objects[key] = body
+
+    def put_object(self, Bucket, Key, Body, ContentType=None):
+        self._store(Key, Body if isinstance(Body, bytes) else Body.encode("utf-8"))
+
+    def get_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise self.exceptions.NoSuchKey(Key)
+        body = self.objects[Key]
+        return {"Body": io.BytesIO(body), "ETag": f'"{hashlib.md5(body).hexdigest()}"'}
+
+    def copy_object(self, Bucket, Key, CopySource):
+        self._store(Key, self.objects[CopySource["Key"]])
+
+    def list_objects_v2(self, Bucket, Prefix):
+        return {"Contents": [{"Key": k} for k in self.objects if k.startswith(Prefix)]}
+
+    def delete_objects(self, Bucket, Delete):
+        for obj in Delete["Objects"]:
+            self.objects.pop(obj["Key"], None)
+
+    def create_multipart_upload(self, Bucket, Key, ContentType=None):
+        upload_id = uuid.uuid4().hex
+        self._uploads[upload_id] = []
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self._uploads[UploadId].append(Body)
+        return {"ETag": hashlib.md5(Body).hexdigest()}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        self._store(Key, b"".join(self._uploads.pop(UploadId)))
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self._uploads.pop(UploadId, None)
@@ -0,0 +1,154 @@
+"""
+Seeded synthetic NEPSE market data.
+
+Produces raw rows in the scraper's 24-column layout (the ShareSansar
+today-share-price table) and matching HTML fixtures, for any number of
+symbols and trading days. Real symbols from lambdas/sectors.json are used
+first, then synthetic ones. Optional knobs inject adversarial input:
+truncated rows, non-numeric cells and a configurable share of low-priced
+(rejected) instruments.
+
+    python bench/synthetic_data.py --symbols 3200 --days 5 --out /tmp/nepse-fixtures
+"""
+import argparse
+import html
+import json
+import os
+import random
+from datetime import date, timedelta
+
+SECTORS_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lambdas", "sectors.json")
+
+# Column headers of the ShareSansar table, in raw row order
+HEADERS = [
+    "S.No", "Symbol", "Conf.", "Open", "High", "Low", "Close", "LTP", "Close - LTP", "Close - LTP %",
+    "VWAP", "Vol", "Prev. Close", "Turnover", "Trans.", "Diff", "Range", "Diff %", "Range %", "VWAP %",
+    "120 Days", "180 Days", "52 Weeks High", "52 Weeks Low"
+]
+
+GARBAGE_VALUES = ["-", "N/A", "", "1,2,3", "abc"]
+
+
+def _load_real_symbols():
+    with open(SECTORS_FILE) as f:
+        data = json.load(f)
+    equities = [s for symbols in data["sectors"].values() for s in symbols]
+    return equities, data["mutual_funds"]
+
+
+def make_universe(n_symbols, rng, low_price_share=None):
+    """
+    Return [(symbol, base_price)] for n symbols. Mutual funds trade near 10
+    (below the processor's MIN_STOCK_PRICE); their share follows the real
+    index unless low_price_share is given.
+    """
+    equities, funds = _load_real_symbols()
+    if low_price_share is None:
+        low_price_share = len(funds) / (len(funds) + len(equities))
+    n_low = int(round(n_symbols * low_price_share))
+
+    low = funds[:n_low] + [f"SYNMF{i}" for i in range(max(0, n_low - len(funds)))]
+    high_count = n_symbols - n_low
+    high = equities[:high_count] + [f"SYN{i:05d}" for i in range(max(0, high_count - len(equities)))]
+
+    universe = [(s, rng.uniform(8.5, 12.5)) for s in low] + [(s, rng.lognormvariate(6, 0.8) + 50) for s in high]
+    universe.sort(key=lambda item: item[0])
+    return universe
+
+
+def _row(idx, symbol, prev_close, rng):
+    close = round(max(1.0, prev_close * (1 + rng.gauss(0, 0.02))), 2)
+    open_ = round(prev_close * (1 + rng.gauss(0, 0.01)), 2)
+    high = round(max(open_, close) * (1 + abs(rng.gauss(0, 0.01))), 2)
+    low = round(min(open_, close) * (1 - abs(rng.gauss(0, 0.01))), 2)
+    ltp = round(rng.uniform(low, high), 2)
+    vwap = round((high + low + close) / 3, 2)
+    vol = float(rng.randint(100, 200000))
+    diff = round(close - prev_close, 2)
+    return [
+        float(idx), symbol, round(rng.uniform(20, 60), 2), open_, high, low, close, ltp,
+        round(close - ltp, 2), round((close - ltp) / ltp * 100, 2) if ltp else 0.0,
+        vwap, vol, round(prev_close, 2), round(vol * vwap, 2), float(rng.randint(1, 2000)),
+        diff, round(high - low, 2), round(diff / prev_close * 100, 2), round((high - low) / low * 100, 2),
+        round((close - vwap) / vwap * 100, 2),
+        round(close * rng.uniform(0.9, 1.1), 2), round(close * rng.uniform(0.85, 1.15), 2),
+        round(close * rng.uniform(1.05, 1.5), 2), round(close * rng.uniform(0.6, 0.95), 2)
+    ]
+
+
+def generate_days(n_symbols=320, days=1, seed=0, start=date(2025, 9, 17),
+                  missing_rate=0.0, garbage_rate=0.0, low_price_share=None):
+    """
+    Yield (trading_date, rows) for each day; rows match the scraper's output.
+    missing_rate truncates rows, garbage_rate replaces a numeric cell with a
+    non-numeric string.
+    """
+    rng = random.Random(seed)
+    universe = make_universe(n_symbols, rng, low_price_share)
+    prices = {symbol: base for symbol, base in universe}
+
+    day = start
+    for _ in range(days):
+        while day.weekday() in (4, 5):  # NEPSE trades Sunday to Thursday
+            day += timedelta(days=1)
+        rows = []
+        for idx, (symbol, _) in enumerate(universe, start=1):
+            row = _row(idx, symbol, prices[symbol], rng)
+            prices[symbol] = row[6]
+            if rng.random() < missing_rate:
+                row = row[:rng.randint(2, len(row) - 1)]
+            if len(row) > 2 and rng.random() < garbage_rate:
+                row[rng.randint(2, len(row) - 1)] = rng.choice(GARBAGE_VALUES)
+            rows.append(row)
+        yield day, rows
+        day += timedelta(days=1)
+
+
+def _cell(value):
+    if isinstance(value, float):
+        return f"{value:,.2f}"
+    return html.escape(str(value))
+
+
+def render_html(rows):
+    """ShareSansar-like page with the table the scraper parses (id="headFixed")."""
+    head = "".join(f"<th>{html.escape(h)}</th>" for h in HEADERS)
+    body = []
+    for row in rows:
+        cells = [f"<td>{_cell(v)}</td>" for v in row]
+        if len(cells) > 1:
+            cells[1] = f'<td><a href="/company/{html.escape(str(row[1]).lower())}">{html.escape(str(row[1]))}</a></td>'
+        body.append("<tr>" + "".join(cells) + "</tr>")
+    return (
+        "<html><body><table class=\"table\" id=\"headFixed\">"
+        f"<thead><tr>{head}</tr></thead><tbody>{''.join(body)}</tbody>"
+        "</table></body></html>"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, default=320)
+    parser.add_argument("--days", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--missing-rate", type=float, default=0.0)
+    parser.add_argument("--garbage-rate", type=float, default=0.0)
+    parser.add_argument("--low-price-share", type=float, default=None)
+    parser.add_argument("--out", required=True, help="Output directory (raw/<date>/*.json and html/<date>.html)")
+    args = parser.parse_args()
+
+    for day, rows in generate_days(args.symbols, args.days, args.seed, missing_rate=args.missing_rate,
+                                   garbage_rate=args.garbage_rate, low_price_share=args.low_price_share):
+        raw_dir = os.path.join(args.out, "raw", str(day))
+        html_dir = os.path.join(args.out, "html")
+        os.makedirs(raw_dir, exist_ok=True)
+        os.makedirs(html_dir, exist_ok=True)
+        with open(os.path.join(raw_dir, f"data_{day:%Y%m%d}T101500.json"), "w") as f:
+            json.dump(rows, f, indent=2)
+        with open(os.path.join(html_dir, f"{day}.html"), "w") as f:
+            f.write(render_html(rows))
+        print(f"{day}: {len(rows)} rows")
+
+
+if __name__ == "__main__":
+    main()
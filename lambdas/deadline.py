@@ -0,0 +1,100 @@
+"""
+Deadline-aware phase runner with S3 checkpoints.
+
+A handler splits its work into named phases. Before each phase the runner
+checks the invocation's remaining time against the phase budget and raises
+DeadlineExceeded early instead of letting Lambda kill the invocation mid-way.
+Each finished phase's result is checkpointed to S3, so the async retry that
+follows a failure resumes from the last completed phase rather than redoing
+the whole handler. Checkpoints are removed once the handler succeeds.
+
+The processor and llm_analysis key their runs on the input's content hash,
+so a checkpoint left by any failed attempt is only ever reused for the same
+input, and a later redelivery resumes from it on purpose. Orphans expire
+through the checkpoints/ lifecycle rule.
+"""
+import json
+
+from botocore.exceptions import ClientError
+
+CHECKPOINT_PREFIX = "checkpoints"
+# Time kept in reserve for logging, ledger updates and the error path
+DEFAULT_SAFETY_MARGIN_MS = 3000
+
+
+class DeadlineExceeded(Exception):
+    """Raised before a phase starts when the invocation has too little time left for it."""
+
+
+class PhaseRunner:
+    def __init__(self, context, s3, bucket, run_id, safety_margin_ms=DEFAULT_SAFETY_MARGIN_MS):
+        self.context = context
+        self.s3 = s3
+        self.bucket = bucket
+        self.prefix = f"{CHECKPOINT_PREFIX}/{run_id.replace('#', '/')}/"
+        self.safety_margin_ms = safety_margin_ms
+        self._existing = None
+
+    def remaining_ms(self):
+        """Milliseconds left in this invocation (unbounded outside Lambda)."""
+        if self.context is None:
+            return float("inf")
+        return self.context.get_remaining_time_in_millis()
+
+    def remaining_seconds(self):
+        """Whole seconds left, or None outside Lambda (for ledger claim expiry)."""
+        if self.context is None:
+            return None
+        return max(1, self.remaining_ms() // 1000)
+
+    def run(self, name, fn, budget_ms=0, checkpoint=True):
+        """
+        Return the checkpointed result of phase `name` if an earlier attempt
+        completed it, otherwise run fn() (its result must be JSON-serializable).
+        """
+        key = f"{self.prefix}{name}.json"
+        if checkpoint and key in self._checkpoints():
+            obj = self.s3.get_object(Bucket=self.bucket, Key=key)
+            print(json.dumps({"level": "INFO", "message": "Resumed phase from checkpoint", "phase": name, "checkpoint": key}))
+            return json.loads(obj["Body"].read())
+
+        remaining = self.remaining_ms()
+        if remaining - self.safety_margin_ms < budget_ms:
+            raise DeadlineExceeded(f"Phase '{name}' needs {budget_ms} ms, only {remaining} ms left")
+
+        result = fn()
+        if checkpoint:
+            self.s3.put_object(
+                Bucket=self.bucket,
+                Key=key,
+                Body=json.dumps(result),
+                ContentType="application/json"
+            )
+            self._existing.add(key)
+        return result
+
+    def scratch_key(self, name):
+        """S3 key for a phase's intermediate output, kept with the checkpoints and removed by clear()."""
+        key = f"{self.prefix}{name}"
+        self._checkpoints().add(key)
+        return key
+
+    def clear(self):
+        """Delete this run's checkpoints after the handler has succeeded."""
+        keys = self._checkpoints()
+        if keys:
+            self.s3.delete_objects(
+                Bucket=self.bucket,
+                Delete={"Objects": [{"Key": k} for k in keys], "Quiet": True}
+            )
+            keys.clear()
+
+    def _checkpoints(self):
+        # One LIST per invocation instead of a GET per phase on fresh runs
+        if self._existing is None:
+            try:
+                resp = self.s3.list_objects_v2(Bucket=self.bucket, Prefix=self.prefix)
+                self._existing = {o["Key"] for o in resp.get("Contents", [])}
+            except ClientError:
+                self._existing = set()
+        return self._existing
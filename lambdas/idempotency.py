@@ -0,0 +1,122 @@
+"""
+Cross-stage idempotency ledger.
+
+Each stage claims an idempotency key (stage + input key + content hash) with a
+conditional write before doing any work. A redelivered event finds the key
+already COMPLETED and short-circuits with the stored result instead of
+re-running the stage. Claims left IN_PROGRESS by a crashed invocation expire
+(handlers set the expiry to their own invocation deadline) so a later retry
+can take them over.
+
+The ledger lives in DynamoDB when LEDGER_TABLE is set; otherwise an in-memory
+stand-in with the same semantics is used (local runs and tests).
+"""
+import hashlib
+import json
+import os
+import time
+
+import boto3
+from botocore.exceptions import ClientError
+
+LEDGER_TABLE = os.environ.get("LEDGER_TABLE")
+IN_PROGRESS_SECONDS = int(os.environ.get("LEDGER_IN_PROGRESS_SECONDS", 15 * 60))
+RECORD_TTL_SECONDS = int(os.environ.get("LEDGER_TTL_SECONDS", 7 * 24 * 60 * 60))
+
+STATUS_IN_PROGRESS = "IN_PROGRESS"
+STATUS_COMPLETED = "COMPLETED"
+
+_ledger = None
+
+
+def content_token(content):
+    """Short, stable hash of an S3 ETag, a body string or raw bytes."""
+    if isinstance(content, str):
+        content = content.strip('"').encode("utf-8")
+    return hashlib.sha256(content).hexdigest()[:16]
+
+
+def idempotency_key(stage, *parts):
+    return "#".join([stage, *[str(p) for p in parts]])
+
+
+class LocalLedger:
+    """In-memory ledger with the same claim/complete/release semantics as DynamoLedger."""
+
+    def __init__(self):
+        self.records = {}
+
+    def claim(self, key, now=None, in_progress_seconds=None):
+        """
+        Return (True, None) if the caller now owns `key`, else (False, existing_record).
+        The claim expires after `in_progress_seconds` (default IN_PROGRESS_SECONDS).
+        """
+        now = int(now if now is not None else time.time())
+        record = self.records.get(key)
+        if record and not (record["status"] == STATUS_IN_PROGRESS and record["expires_at"] < now):
+            return False, _decode(record)
+        self.records[key] = {"status": STATUS_IN_PROGRESS, "expires_at": now + (in_progress_seconds or IN_PROGRESS_SECONDS)}
+        return True, None
+
+    def complete(self, key, result=None):
+        self.records[key] = {"status": STATUS_COMPLETED, "result": json.dumps(result)}
+
+    def release(self, key):
+        self.records.pop(key, None)
+
+
+class DynamoLedger:
+    """Ledger backed by a DynamoDB table with hash key `idempotency_key`."""
+
+    def __init__(self, table):
+        self.table = table
+
+    def claim(self, key, now=None, in_progress_seconds=None):
+        now = int(now if now is not None else time.time())
+        try:
+            self.table.put_item(
+                Item={
+                    "idempotency_key": key,
+                    "status": STATUS_IN_PROGRESS,
+                    "expires_at": now + (in_progress_seconds or IN_PROGRESS_SECONDS),
+                    "ttl": now + RECORD_TTL_SECONDS
+                },
+                ConditionExpression="attribute_not_exists(idempotency_key) OR (#s = :in_progress AND expires_at < :now)",
+                ExpressionAttributeNames={"#s": "status"},
+                ExpressionAttributeValues={":in_progress": STATUS_IN_PROGRESS, ":now": now}
+            )
+            return True, None
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+        record = self.table.get_item(Key={"idempotency_key": key}, ConsistentRead=True).get("Item", {})
+        return False, _decode(record)
+
+    def complete(self, key, result=None):
+        self.table.update_item(
+            Key={"idempotency_key": key},
+            UpdateExpression="SET #s = :completed, #r = :result REMOVE expires_at",
+            ExpressionAttributeNames={"#s": "status", "#r": "result"},
+            ExpressionAttributeValues={":completed": STATUS_COMPLETED, ":result": json.dumps(result)}
+        )
+
+    def release(self, key):
+        self.table.delete_item(Key={"idempotency_key": key})
+
+
+def _decode(record):
+    decoded = {"status": record.get("status")}
+    if record.get("result") is not None:
+        decoded["result"] = json.loads(record["result"])
+    return decoded
+
+
+def get_ledger():
+    """Ledger for this container, created on first use."""
+    global _ledger
+    if _ledger is None:
+        if LEDGER_TABLE:
+            _ledger = DynamoLedger(boto3.resource("dynamodb").Table(LEDGER_TABLE))
+        else:
+            _ledger = LocalLedger()
+    return _ledger
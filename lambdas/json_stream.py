@@ -0,0 +1,151 @@
+"""
+Incremental JSON helpers for large S3 objects.
+
+Reading walks a top-level JSON array element by element straight off the S3
+body stream, and writing streams array elements back out through a multipart
+upload, so memory stays proportional to a chunk rather than to the file.
+"""
+import codecs
+import json
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+# S3 multipart parts (except the last) must be at least 5 MB
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+# Characters that can follow a complete array element
+_DELIMITERS = _WHITESPACE + ",]"
+
+
+def iter_json_array(stream, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield the elements of a top-level JSON array from a file-like object with
+    a read(size) method (e.g. an S3 StreamingBody) without loading it whole.
+    Raises ValueError if the document is not a well-formed JSON array.
+    """
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buf, pos, eof = "", 0, False
+    started, expect_value, allow_close = False, True, True
+
+    while True:
+        while pos < len(buf) and buf[pos] in _WHITESPACE:
+            pos += 1
+
+        if pos == len(buf) and eof:
+            raise ValueError("Unexpected end of JSON array" if started else "Expected a JSON array, got empty input")
+
+        if pos < len(buf):
+            char = buf[pos]
+            if not started:
+                if char != "[":
+                    raise ValueError(f"Expected a JSON array, got {char!r}")
+                started = True
+                pos += 1
+                continue
+            if char == "]" and allow_close:
+                return
+            if not expect_value:
+                if char != ",":
+                    raise ValueError(f"Expected ',' or ']' at offset {pos}, got {char!r}")
+                pos += 1
+                expect_value, allow_close = True, False
+                continue
+            try:
+                value, end = _decoder.raw_decode(buf, pos)
+                # A number cut at the chunk edge ("12." or "1e") decodes as a
+                # shorter number, so it is only complete once a delimiter follows
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    complete = end < len(buf) and buf[end] in _DELIMITERS
+                else:
+                    complete = end < len(buf)
+                if complete or eof:
+                    yield value
+                    pos = end
+                    expect_value, allow_close = False, True
+                    continue
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+
+        chunk = stream.read(chunk_size)
+        eof = not chunk
+        buf = buf[pos:] + utf8.decode(chunk or b"", final=eof)
+        pos = 0
+
+
+class S3JsonArrayWriter:
+    """
+    Write a JSON array to S3 one element at a time (one element per line).
+
+    Output is buffered up to `part_size`; small arrays are stored with a single
+    put_object, larger ones switch to a multipart upload so only one part is
+    held in memory. The object only appears in S3 once close() succeeds.
+    """
+
+    def __init__(self, s3, bucket, key, part_size=DEFAULT_PART_SIZE, content_type="application/json"):
+        self.s3 = s3
+        self.bucket = bucket
+        self.key = key
+        self.part_size = part_size
+        self.content_type = content_type
+        self.count = 0
+        self._buffer = bytearray(b"[")
+        self._upload_id = None
+        self._parts = []
+
+    def write(self, item):
+        self._buffer += b"\n" if self.count == 0 else b",\n"
+        self._buffer += json.dumps(item).encode("utf-8")
+        self.count += 1
+        if len(self._buffer) >= self.part_size:
+            self._flush_part()
+
+    def close(self):
+        self._buffer += b"\n]" if self.count else b"]"
+        if self._upload_id is None:
+            self.s3.put_object(
+                Bucket=self.bucket,
+                Key=self.key,
+                Body=bytes(self._buffer),
+                ContentType=self.content_type
+            )
+        else:
+            self._flush_part()
+            self.s3.complete_multipart_upload(
+                Bucket=self.bucket,
+                Key=self.key,
+                UploadId=self._upload_id,
+                MultipartUpload={"Parts": self._parts}
+            )
+        self._buffer = bytearray()
+
+    def abort(self):
+        if self._upload_id is not None:
+            self.s3.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self._upload_id)
+            self._upload_id = None
+
+    def _flush_part(self):
+        if self._upload_id is None:
+            resp = self.s3.create_multipart_upload(Bucket=self.bucket, Key=self.key, ContentType=self.content_type)
+            self._upload_id = resp["UploadId"]
+        part_number = len(self._parts) + 1
+        resp = self.s3.upload_part(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self._upload_id,
+            PartNumber=part_number,
+            Body=bytes(self._buffer)
+        )
+        self._parts.append({"ETag": resp["ETag"], "PartNumber": part_number})
+        self._buffer = bytearray()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
@@ -4,6 +4,9 @@ import os
 import re
 from decimal import Decimal
 import uuid
+from json_stream import iter_json_array
+from idempotency import content_token, get_ledger, idempotency_key
+from deadline import DeadlineExceeded, PhaseRunner
 
 s3 = boto3.client("s3")
 dynamodb = boto3.resource("dynamodb")
@@ -14,6 +17,13 @@ BUCKET_NAME = os.environ["BUCKET_NAME"]
 DYNAMO_TABLE = os.environ["DYNAMO_TABLE"]
 LLM_MODEL = os.environ.get("LLM_MODEL", "amazon.nova-lite-v1:0")
 ALERT_EVENT_BUS = os.environ.get("ALERT_EVENT_BUS")
+# Reports larger than this are written to S3 and only referenced from the event
+# (EventBridge rejects entries over 256 KB)
+EVENT_DETAIL_MAX_BYTES = int(os.environ.get("EVENT_DETAIL_MAX_BYTES", 64 * 1024))
+
+# Minimum time left before starting each phase
+PREPARE_BUDGET_MS = 5000
+BEDROCK_BUDGET_MS = 30000
 
 def _convert_numeric_to_decimal(obj):
     if isinstance(obj, list):
@@ -24,6 +34,33 @@ def _convert_numeric_to_decimal(obj):
         return Decimal(str(obj))
     return obj
 
+def _format_rows(rows):
+    """
+    Render streamed rows like json.dumps(list(rows), indent=2), without
+    materialising the list. The Sector column is left out: the prompt gets the
+    per-sector summary instead. Returns (text, row_count).
+    """
+    parts = []
+    for row in rows:
+        if isinstance(row, dict):
+            row = {k: v for k, v in row.items() if k != "Sector"}
+        parts.append("  " + json.dumps(row, indent=2).replace("\n", "\n  "))
+    if not parts:
+        return "[]", 0
+    return "[\n" + ",\n".join(parts) + "\n]", len(parts)
+
+def _format_sector_summary(sector_summary):
+    """One compact line per sector for the prompt."""
+    lines = []
+    for sector, stats in sector_summary.items():
+        avg_change = stats.get("avg_change")
+        lines.append(
+            f"{sector}: {stats['count']} stocks, turnover {stats['turnover']}, "
+            f"{stats['advancers']} up / {stats['decliners']} down / {stats['unchanged']} unchanged, "
+            f"avg change {'N/A' if avg_change is None else f'{avg_change}%'}"
+        )
+    return "\n".join(lines) if lines else "Not available."
+
 def _send_event_to_bus(event_bus_name, detail):
     if not event_bus_name:
         return
@@ -37,36 +74,78 @@ def _send_event_to_bus(event_bus_name, detail):
     print("EventBridge response:", resp)
     return resp     
 
+def _offload_detail(detail):
+    """
+    Claim-check for large reports: store the full detail in S3 and return a
+    small reference with the key stats the notifier needs up front.
+    """
+    body = json.dumps(detail)
+    if len(body.encode("utf-8")) <= EVENT_DETAIL_MAX_BYTES:
+        return detail
+
+    file_key = detail["file_key"]
+    report_key = "reports/" + file_key.split("/", 1)[-1]
+    s3.put_object(
+        Bucket=BUCKET_NAME,
+        Key=report_key,
+        Body=body,
+        ContentType="application/json"
+    )
+    return {
+        "file_key": file_key,
+        "report_key": report_key,
+        "report_bytes": len(body.encode("utf-8")),
+        "anomaly_count": len([l for l in detail.get("anomalies", "").splitlines() if l.strip()]),
+        "raw_count": detail.get("raw_count"),
+        "processed_count": detail.get("processed_count"),
+        "rejected_count": detail.get("rejected_count"),
+        "sector_summary": detail.get("sector_summary"),
+        "correlation_id": detail.get("correlation_id")
+    }
+
 
 def lambda_handler(event, context):
     correlation_id = str(uuid.uuid4())
+    ledger = get_ledger()
+    claim_key = None
     try:
         key = event["Records"][0]["s3"]["object"]["key"]
         print(json.dumps({"level": "INFO", "message": "Fetching processed file", "file": key, "correlation_id": correlation_id}))
 
         obj = s3.get_object(Bucket=BUCKET_NAME, Key=key)
-        processed_data = json.loads(obj["Body"].read())
-        if not isinstance(processed_data, list):
-            raise ValueError("Processed data must be a list.")
-
-        # --- Derive metadata key ---
-        if key.startswith("processed/") and key.endswith(".json"):
-            date_prefix = key.split("/")[1]       
-            filename = key.split("/")[-1]        
-            base = filename.replace(".json", "")  
-            metadata_key = f"metadata/{date_prefix}/{base}_meta.json"
-        else:
-            raise ValueError(f"Unexpected processed key format: {key}")
-
-        # --- Load metadata ---
-        metadata_obj = s3.get_object(Bucket=BUCKET_NAME, Key=metadata_key)
-        metadata = json.loads(metadata_obj["Body"].read())
-        raw_count = metadata.get("raw_count", len(processed_data))
-        processed_count = metadata.get("processed_count", len(processed_data))
-        rejected_count = metadata.get("rejected_count", 0)    
-
-        # LLM Prompt
-        prompt = f"""
+
+        # Skip redelivered events: no second Bedrock call, DynamoDB item or alert
+        claim_key = idempotency_key("llm_analysis", key, content_token(obj["ETag"]))
+        runner = PhaseRunner(context, s3, BUCKET_NAME, claim_key)
+        claimed, previous = ledger.claim(claim_key, in_progress_seconds=runner.remaining_seconds())
+        if not claimed:
+            claim_key = None
+            print(json.dumps({"level": "INFO", "message": "Duplicate processed file skipped", "file": key, "correlation_id": correlation_id}))
+            return {"status": "duplicate", "file": key, "result": previous.get("result"), "correlation_id": correlation_id}
+
+        # Phase 1: build the prompt from the processed file and its metadata
+        def prepare():
+            market_data, row_count = _format_rows(iter_json_array(obj["Body"]))
+
+            # --- Derive metadata key ---
+            if key.startswith("processed/") and key.endswith(".json"):
+                date_prefix = key.split("/")[1]       
+                filename = key.split("/")[-1]        
+                base = filename.replace(".json", "")  
+                metadata_key = f"metadata/{date_prefix}/{base}_meta.json"
+            else:
+                raise ValueError(f"Unexpected processed key format: {key}")
+
+            # --- Load metadata ---
+            metadata_obj = s3.get_object(Bucket=BUCKET_NAME, Key=metadata_key)
+            metadata = json.loads(metadata_obj["Body"].read())
+            raw_count = metadata.get("raw_count", row_count)
+            processed_count = metadata.get("processed_count", row_count)
+            rejected_count = metadata.get("rejected_count", 0)    
+            sector_summary = metadata.get("sector_summary", {})
+
+            # LLM Prompt
+            prompt = f"""
 You are a financial market analyst. You are given daily stock market data in JSON format.
 
 Perform structured analysis with these sections only:
@@ -97,29 +176,53 @@ Opportunity: Stocks such as ADBSL and NCCD86 showed gains despite market volatil
 Risk: Highly volatile stocks like GHL and PPCL reported decreased end value. These might be riskier investments in current conditions.
 Risk: Stocks with significant drops, including BHPC and ALBSL, may stabilize, but caution is advised as they are likely to remain unstable.
 
+Here is the per-sector summary (use it to describe sector rotation):
+{_format_sector_summary(sector_summary)}
+
 Here is the market data:
-{json.dumps(processed_data, indent=2)}
+{market_data}
 """
 
-        body = {
-            "messages": [{"role": "user", "content": [{"text": prompt}]}],
-            "inferenceConfig": {"maxTokens": 800, "temperature": 0.0, "topP": 1}
-        }
+            return {
+                "prompt": prompt,
+                "raw_count": raw_count,
+                "processed_count": processed_count,
+                "rejected_count": rejected_count,
+                "sector_summary": sector_summary
+            }
 
-        response = bedrock.invoke_model(
-            modelId=LLM_MODEL,
-            contentType="application/json",
-            accept="application/json",
-            body=json.dumps(body)
-        )
+        prepared = runner.run("prepare", prepare, budget_ms=PREPARE_BUDGET_MS)
+        prompt = prepared["prompt"]
+        raw_count = prepared["raw_count"]
+        processed_count = prepared["processed_count"]
+        rejected_count = prepared["rejected_count"]
+        sector_summary = prepared["sector_summary"]
 
-        raw = response["body"].read()
-        parsed = json.loads(raw)
-        analysis_text = (
-            parsed.get("output", {}).get("message", {}).get("content", [{}])[0].get("text", "")
-        )
-        if not analysis_text:
-            analysis_text = "No analysis generated."
+        # Phase 2: Bedrock call, only started if it can finish in time
+        def analyse():
+            body = {
+                "messages": [{"role": "user", "content": [{"text": prompt}]}],
+                "inferenceConfig": {"maxTokens": 800, "temperature": 0.0, "topP": 1}
+            }
+
+            response = bedrock.invoke_model(
+                modelId=LLM_MODEL,
+                contentType="application/json",
+                accept="application/json",
+                body=json.dumps(body)
+            )
+
+            raw = response["body"].read()
+            parsed = json.loads(raw)
+            analysis_text = (
+                parsed.get("output", {}).get("message", {}).get("content", [{}])[0].get("text", "")
+            )
+            if not analysis_text:
+                analysis_text = "No analysis generated."
+
+            return analysis_text
+
+        analysis_text = runner.run("analyse", analyse, budget_ms=BEDROCK_BUDGET_MS)
 
         # Extract sections
         def extract_section(name, text):
@@ -146,7 +249,7 @@ Here is the market data:
 
         # Trigger EventBridge if anomalies exist
         if anomalies:
-            _send_event_to_bus(ALERT_EVENT_BUS, {
+            _send_event_to_bus(ALERT_EVENT_BUS, _offload_detail({
                 "file_key": key,
                 "market_summary": market_summary,
                 "anomalies": anomalies,
@@ -154,8 +257,18 @@ Here is the market data:
                 "raw_count": raw_count,
                 "processed_count": processed_count,
                 "rejected_count": rejected_count,
+                "sector_summary": sector_summary,
                 "correlation_id": correlation_id
-            })
+            }))
+
+        ledger.complete(claim_key, {
+            "file_key": key,
+            "raw_count": raw_count,
+            "processed_count": processed_count,
+            "rejected_count": rejected_count,
+            "correlation_id": correlation_id
+        })
+        runner.clear()
 
         return {
             "status": "success",
@@ -165,9 +278,19 @@ Here is the market data:
             "raw_count": raw_count,
             "processed_count": processed_count,
             "rejected_count": rejected_count,
+            "sector_summary": sector_summary,
             "correlation_id": correlation_id
         }
 
+    except DeadlineExceeded as e:
+        # Raising makes Lambda retry; the retry skips the checkpointed phases
+        if claim_key:
+            ledger.release(claim_key)
+        print(json.dumps({"level": "ERROR", "message": str(e), "correlation_id": correlation_id}))
+        raise
+
     except Exception as e:
+        if claim_key:
+            ledger.release(claim_key)
         print(json.dumps({"level": "ERROR", "message": str(e), "correlation_id": correlation_id}))
         return {"status": "error", "message": str(e), "correlation_id": correlation_id}
@@ -1,28 +1,62 @@
 import boto3
 import os
 import html
+import json
+from idempotency import get_ledger, idempotency_key
 
 ses = boto3.client("ses")
+s3 = boto3.client("s3")
+
+BUCKET_NAME = os.environ.get("BUCKET_NAME")
+
+# Offloaded reports fetched by this container, keyed by report_key
+REPORT_CACHE_SIZE = 8
+_report_cache = {}
+
+def _resolve_detail(detail):
+    """Fetch the full report for claim-check events; inline events are returned as-is."""
+    report_key = detail.get("report_key")
+    if not report_key:
+        return detail
+    if report_key not in _report_cache:
+        if len(_report_cache) >= REPORT_CACHE_SIZE:
+            _report_cache.pop(next(iter(_report_cache)))
+        obj = s3.get_object(Bucket=BUCKET_NAME, Key=report_key)
+        _report_cache[report_key] = json.loads(obj["Body"].read())
+    return {**_report_cache[report_key], **detail}
 
 def lambda_handler(event, context):
+    ledger = get_ledger()
+    claim_key = None
     try:
         print("Received event:", event)
 
+        # One email per analysed file, even if the event is delivered twice
+        claim_key = idempotency_key("notifier", event['detail'].get('file_key', event.get('id', 'N/A')))
+        # The claim expires with this invocation, so a timed-out attempt does not block Lambda's retry
+        claimed, previous = ledger.claim(claim_key, in_progress_seconds=max(1, context.get_remaining_time_in_millis() // 1000))
+        if not claimed:
+            claim_key = None
+            print("Duplicate event skipped:", previous)
+            return {"status": "duplicate", "result": previous.get("result")}
+
+        detail = _resolve_detail(event['detail'])
+
         email_from = os.environ["SES_EMAIL_FROM"]
         email_to = os.environ["SES_EMAIL_TO"]
 
-        file_key = event['detail'].get('file_key', 'N/A')
-        correlation_id = event['detail'].get('correlation_id', 'N/A')
+        file_key = detail.get('file_key', 'N/A')
+        correlation_id = detail.get('correlation_id', 'N/A')
 
         # ---- Extract values from event ----
-        market_summary = event['detail'].get('market_summary', '')
-        anomalies_str = event['detail'].get('anomalies', '')
-        suggestions_str = event['detail'].get('suggestions', '')
+        market_summary = detail.get('market_summary', '')
+        anomalies_str = detail.get('anomalies', '')
+        suggestions_str = detail.get('suggestions', '')
 
         # ---- Extract row counts ----
-        raw_count = event['detail'].get('raw_count', 'N/A')
-        processed_count = event['detail'].get('processed_count', 'N/A')
-        rejected_count = event['detail'].get('rejected_count', 'N/A')
+        raw_count = detail.get('raw_count', 'N/A')
+        processed_count = detail.get('processed_count', 'N/A')
+        rejected_count = detail.get('rejected_count', 'N/A')
 
        # ---- Modern Row Counts Card ----
         html_counts = f"""
@@ -59,6 +93,52 @@ def lambda_handler(event, context):
         </div>
         """
 
+        # ---- Sector Rollup Card ----
+        sector_summary = detail.get('sector_summary') or {}
+        html_sectors = ""
+        if sector_summary:
+            sector_rows = ""
+            for idx, (sector, stats) in enumerate(sector_summary.items()):
+                row_bg = '#FFFFFF' if idx % 2 == 0 else '#F9FAFB'
+                avg_change = stats.get('avg_change')
+                if avg_change is None:
+                    change_color, change_text = '#6B7280', 'N/A'
+                else:
+                    change_color = '#10B981' if avg_change >= 0 else '#EF4444'
+                    change_text = f"{avg_change:+.2f}%"
+                sector_rows += f"""
+                    <tr style='background: {row_bg};'>
+                        <td style='padding: 12px 16px; border-bottom: 1px solid #E5E7EB; font-weight: 600; color: #1F2937;'>{html.escape(sector)}</td>
+                        <td style='padding: 12px 16px; border-bottom: 1px solid #E5E7EB; color: #4B5563; font-family: monospace;'>{stats.get('turnover', 0):,.2f}</td>
+                        <td style='padding: 12px 16px; border-bottom: 1px solid #E5E7EB; color: #4B5563; font-family: monospace;'>
+                            <span style='color: #10B981;'>{stats.get('advancers', 0)}</span> /
+                            <span style='color: #EF4444;'>{stats.get('decliners', 0)}</span> /
+                            {stats.get('unchanged', 0)}
+                        </td>
+                        <td style='padding: 12px 16px; border-bottom: 1px solid #E5E7EB; color: {change_color}; font-weight: 600; font-family: monospace;'>{change_text}</td>
+                    </tr>
+                """
+            html_sectors = f"""
+            <div style='background: #fff; border-radius: 16px; padding: 28px; margin-bottom: 24px; box-shadow: 0 4px 20px rgba(0,0,0,0.08); border: 1px solid rgba(0,0,0,0.05); font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, sans-serif;'>
+                <h2 style='color: #1F2937; font-size: 24px; font-weight: 700; margin: 0 0 24px 0; letter-spacing: -0.5px;'>Sector Rollup</h2>
+                <div style='overflow-x: auto;'>
+                    <table style='border-collapse: collapse; width: 100%; background: #fff; border-radius: 12px; overflow: hidden; box-shadow: 0 1px 3px rgba(0,0,0,0.1);'>
+                        <thead>
+                            <tr style='background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);'>
+                                <th style='padding: 14px 16px; text-align: left; color: #fff; font-weight: 600; font-size: 14px; text-transform: uppercase; letter-spacing: 0.5px;'>Sector</th>
+                                <th style='padding: 14px 16px; text-align: left; color: #fff; font-weight: 600; font-size: 14px; text-transform: uppercase; letter-spacing: 0.5px;'>Turnover</th>
+                                <th style='padding: 14px 16px; text-align: left; color: #fff; font-weight: 600; font-size: 14px; text-transform: uppercase; letter-spacing: 0.5px;'>Up / Down / Flat</th>
+                                <th style='padding: 14px 16px; text-align: left; color: #fff; font-weight: 600; font-size: 14px; text-transform: uppercase; letter-spacing: 0.5px;'>Avg Change</th>
+                            </tr>
+                        </thead>
+                        <tbody>
+                            {sector_rows}
+                        </tbody>
+                    </table>
+                </div>
+            </div>
+            """
+
         # ---- Modern Anomalies Card ----
         if anomalies_str:
             anomaly_lines = [line.strip() for line in anomalies_str.splitlines() if line.strip()]
@@ -353,6 +433,7 @@ def lambda_handler(event, context):
                 
                 {html_counts}
                 {html_market_summary}
+                {html_sectors}
                 {html_anomalies}
                 {suggestions_html}
             </div>
@@ -372,8 +453,11 @@ def lambda_handler(event, context):
         )
 
         print("SES Response:", response)
+        ledger.complete(claim_key, {"message_id": response["MessageId"]})
         return {"status": "success", "message_id": response["MessageId"]}
 
     except Exception as e:
+        if claim_key:
+            ledger.release(claim_key)
         print("Error sending SES email:", str(e))
         return {"status": "error", "message": str(e)}
\ No newline at end of file
@@ -1,11 +1,16 @@
 import json
 import boto3
 import os
+import re
 import uuid
-from datetime import datetime
+from json_stream import iter_json_array, S3JsonArrayWriter
+from idempotency import content_token, get_ledger, idempotency_key
+from deadline import DeadlineExceeded, PhaseRunner
+from sectors import INSTRUMENT_EQUITY, UNCLASSIFIED, SectorRollup, classify
 
 s3 = boto3.client("s3")
 BUCKET_NAME = os.environ["BUCKET_NAME"]
+REJECT_INDEX_KEY = os.environ.get("REJECT_INDEX_KEY", "state/reject_index.json")
 
 # Columns we want in processed file
 REQUIRED_COLUMNS = ["Symbol", "Open", "High", "Low", "Close", "LTP", "Vol", "Turnover", "Diff %"]
@@ -14,79 +19,209 @@ COLUMN_INDICES = [1, 3, 4, 5, 6, 7, 11, 13, 17]
 
 MIN_STOCK_PRICE = 20  # filter threshold for mutual funds
 
+# Minimum time left before streaming the raw file
+TRANSFORM_BUDGET_MS = 10000
+
+# Reject categories
+REJECT_BELOW_MIN_PRICE = "below_min_price"
+REJECT_MALFORMED = "malformed"
+# Index entry for a rejected symbol that matches no known instrument type
+UNKNOWN_INSTRUMENT = "unknown"
+# Below-price rejects of these are data problems, surfaced on every run
+SURFACED_INSTRUMENTS = (UNKNOWN_INSTRUMENT, INSTRUMENT_EQUITY)
+
+# Symbol patterns for instruments that are rejected every day by design
+# (only consulted for rejected symbols missing from sectors.json; debentures
+# are already matched by sectors.classify). A bare MF or F suffix also ends
+# equity symbols (e.g. microfinance), so those need a scheme digit.
+KNOWN_REJECT_PATTERNS = [
+    ("mutual_fund", re.compile(r"^[A-Z0-9]*(\dMF|MF\d+|(EF|GF|SF|BF|CF|SY)\d*|F\d+)$")),
+]
+
+
+def _load_reject_index():
+    """Load the persistent index of known rejects, or an empty one on first run."""
+    try:
+        obj = s3.get_object(Bucket=BUCKET_NAME, Key=REJECT_INDEX_KEY)
+        return json.loads(obj["Body"].read())
+    except s3.exceptions.NoSuchKey:
+        return {"symbols": {}, "known_count": 0}
+
+
+def _classify_rejects(rejected_records, index, date_prefix):
+    """
+    Split rejects into known (stable, count only) and novel (stored in full).
+
+    A reject is known when it is a below-price reject for a non-equity
+    instrument: per the sector index, or for symbols missing from it, a known
+    symbol pattern. The reject index records each symbol's instrument and
+    first_seen date; it never overrides the classification. Indexed equities
+    and unknown instruments stay novel on every run, so a persistent data
+    fault keeps being surfaced. Malformed rows are always novel.
+    """
+    symbols = index.setdefault("symbols", {})
+    novel, by_category = [], {}
+
+    for record in rejected_records:
+        category = record.get("category", REJECT_MALFORMED)
+        row = record.get("row")
+        symbol = row.get("Symbol") if isinstance(row, dict) else None
+
+        if category == REJECT_MALFORMED or not isinstance(symbol, str):
+            novel.append(record)
+            continue
+
+        # Classified on every run (a dict lookup), so a corrected sectors.json
+        # also applies to symbols that are already in the reject index
+        sector, instrument = classify(symbol)
+        if sector == UNCLASSIFIED and instrument == INSTRUMENT_EQUITY:
+            # Not in the bundled index: fall back to the symbol patterns
+            instrument = next((name for name, pattern in KNOWN_REJECT_PATTERNS if pattern.match(symbol)), UNKNOWN_INSTRUMENT)
+        entry = symbols.get(symbol)
+        if not (entry and entry.get("category") == category and entry.get("instrument") == instrument):
+            symbols[symbol] = {"category": category, "instrument": instrument, "first_seen": date_prefix}
+        if instrument not in SURFACED_INSTRUMENTS:
+            by_category[category] = by_category.get(category, 0) + 1
+        else:
+            novel.append(record)
+
+    known_count = sum(by_category.values())
+    summary = {
+        "count": known_count,
+        "delta": known_count - index.get("known_count", 0),
+        "by_category": by_category,
+    }
+    index["known_count"] = known_count
+    return novel, summary
+
 def lambda_handler(event, context):
     correlation_id = str(uuid.uuid4())
     log = {"correlation_id": correlation_id, "event": event}
     print(json.dumps({"level": "INFO", "message": "Processor Lambda started", **log}))
 
+    ledger = get_ledger()
+    claim_key = None
     try:
         # Get S3 object key
         key = event["Records"][0]["s3"]["object"]["key"]
         obj = s3.get_object(Bucket=BUCKET_NAME, Key=key)
-        raw_data = json.loads(obj["Body"].read())
 
-        if not isinstance(raw_data, list):
-            raise ValueError(f"Raw data must be a list of rows. Got type {type(raw_data)}")
+        # Skip redelivered events for a raw object that was already processed
+        content_hash = content_token(obj["ETag"])
+        claim_key = idempotency_key("processor", key, content_hash)
+        runner = PhaseRunner(context, s3, BUCKET_NAME, claim_key)
+        claimed, previous = ledger.claim(claim_key, in_progress_seconds=runner.remaining_seconds())
+        if not claimed:
+            claim_key = None
+            print(json.dumps({"level": "INFO", "message": "Duplicate raw file skipped", "file": key, "correlation_id": correlation_id}))
+            return {"status": "duplicate", "file": key, "result": previous.get("result"), "correlation_id": correlation_id}
 
-        processed_records = []
-        rejected_records = []
+        # Output keys are derived from the input key and content hash, so a
+        # retry overwrites its own output instead of creating a second file
+        date_prefix = key.split("/")[1]  # raw/YYYY-MM-DD/
+        base = f"{key.split('/')[-1].replace('.json', '')}_{content_hash[:8]}"
+        processed_key = f"processed/{date_prefix}/{base}.json"
+        # processed/ triggers llm_analysis, so rows are staged with the
+        # checkpoints and only published once the metadata exists
+        staged_key = runner.scratch_key("processed.json")
 
-        for row in raw_data:
-            try:
-                # Map fixed indices to required columns
-                filtered_row = {col: row[idx] for col, idx in zip(REQUIRED_COLUMNS, COLUMN_INDICES)}
+        # Phase 1: stream rows from S3 and write processed rows straight back
+        # out (to the staged key), so memory stays proportional to a chunk rather
+        # than the whole file. The counts and rejects are checkpointed so a
+        # retry skips the re-read.
+        def transform():
+            raw_count = 0
+            rejected_records = []
+            rollup = SectorRollup()
 
-                # Filter out stocks with price < MIN_STOCK_PRICE (mutual funds)
-                close_price = float(filtered_row.get("Close", "0") or 0)
-                if close_price < MIN_STOCK_PRICE:
-                    rejected_records.append({
-                        "row": filtered_row,
-                        "reason": f"Close price {close_price} < {MIN_STOCK_PRICE} (likely mutual fund)"
-                    })
-                    continue
+            with S3JsonArrayWriter(s3, BUCKET_NAME, staged_key) as processed_writer:
+                for row in iter_json_array(obj["Body"]):
+                    raw_count += 1
+                    try:
+                        # Map fixed indices to required columns
+                        filtered_row = {col: row[idx] for col, idx in zip(REQUIRED_COLUMNS, COLUMN_INDICES)}
 
-                # Convert all numeric values to strings
-                for k, v in filtered_row.items():
-                    if isinstance(v, (int, float)):
-                        filtered_row[k] = str(v)
+                        # Filter out stocks with price < MIN_STOCK_PRICE (mutual funds)
+                        close_price = float(filtered_row.get("Close", "0") or 0)
+                        if close_price < MIN_STOCK_PRICE:
+                            rejected_records.append({
+                                "row": filtered_row,
+                                "reason": f"Close price {close_price} < {MIN_STOCK_PRICE} (likely mutual fund)",
+                                "category": REJECT_BELOW_MIN_PRICE
+                            })
+                            continue
 
-                processed_records.append(filtered_row)
+                        # Tag with sector and roll up in the same pass
+                        sector = classify(filtered_row["Symbol"])[0]
+                        rollup.add(sector, filtered_row["Turnover"], filtered_row["Diff %"])
+                        filtered_row["Sector"] = sector
 
-            except Exception as e:
-                rejected_records.append({"row": row, "reason": str(e)})
+                        # Convert all numeric values to strings
+                        for k, v in filtered_row.items():
+                            if isinstance(v, (int, float)):
+                                filtered_row[k] = str(v)
 
-        # Save processed file in S3
-        date_prefix = key.split("/")[1]  # raw/YYYY-MM-DD/
-        timestamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
-        processed_key = f"processed/{date_prefix}/data_{timestamp}.json"
-        s3.put_object(
-            Bucket=BUCKET_NAME,
-            Key=processed_key,
-            Body=json.dumps(processed_records, indent=2),
-            ContentType="application/json"
-        )
+                        processed_writer.write(filtered_row)
+
+                    except Exception as e:
+                        rejected_records.append({"row": row, "reason": str(e), "category": REJECT_MALFORMED})
+
+            return {
+                "raw_count": raw_count,
+                "processed_count": processed_writer.count,
+                "rejected_records": rejected_records,
+                "sector_summary": rollup.summary()
+            }
+
+        transformed = runner.run("transform", transform, budget_ms=TRANSFORM_BUDGET_MS)
+        raw_count = transformed["raw_count"]
+        processed_count = transformed["processed_count"]
+        rejected_records = transformed["rejected_records"]
+        sector_summary = transformed["sector_summary"]
+
+        # Known rejects (mutual funds, debentures, ...) are only counted;
+        # novel rejects are saved in full and surfaced in the logs
+        reject_index = _load_reject_index()
+        previous_index = json.dumps(reject_index, sort_keys=True)
+        novel_records, known_summary = _classify_rejects(rejected_records, reject_index, date_prefix)
 
-        # Save rejected rows (including mutual funds) if any
         reject_key = None
-        if rejected_records:
-            reject_key = f"rejects/{date_prefix}/data_{timestamp}.json"
+        if novel_records:
+            reject_key = f"rejects/{date_prefix}/{base}.json"
             s3.put_object(
                 Bucket=BUCKET_NAME,
                 Key=reject_key,
-                Body=json.dumps(rejected_records, indent=2),
+                Body=json.dumps(novel_records, indent=2),
+                ContentType="application/json"
+            )
+            print(json.dumps({
+                "level": "WARNING",
+                "message": "Novel rejects found",
+                "correlation_id": correlation_id,
+                "novel_rejects": novel_records
+            }))
+
+        if json.dumps(reject_index, sort_keys=True) != previous_index:
+            s3.put_object(
+                Bucket=BUCKET_NAME,
+                Key=REJECT_INDEX_KEY,
+                Body=json.dumps(reject_index, indent=2),
                 ContentType="application/json"
             )
 
         # Save metadata for counts
         metadata = {
-            "raw_count": len(raw_data),
-            "processed_count": len(processed_records),
+            "raw_count": raw_count,
+            "processed_count": processed_count,
             "rejected_count": len(rejected_records),
+            "novel_rejected_count": len(novel_records),
+            "known_rejected": known_summary,
+            "sector_summary": sector_summary,
             "processed_file": processed_key,
             "rejected_file": reject_key,
             "correlation_id": correlation_id
         }
-        metadata_key = f"metadata/{date_prefix}/data_{timestamp}_meta.json"
+        metadata_key = f"metadata/{date_prefix}/{base}_meta.json"
         s3.put_object(
             Bucket=BUCKET_NAME,
             Key=metadata_key,
@@ -94,10 +229,29 @@ def lambda_handler(event, context):
             ContentType="application/json"
         )
 
+        # Publish last: llm_analysis fires on this object and reads the metadata
+        s3.copy_object(
+            Bucket=BUCKET_NAME,
+            Key=processed_key,
+            CopySource={"Bucket": BUCKET_NAME, "Key": staged_key}
+        )
+
+        ledger.complete(claim_key, metadata)
+        runner.clear()
+
         print(json.dumps({"level": "INFO", "message": "Processor Lambda completed", **metadata}))
         return metadata
 
+    except DeadlineExceeded as e:
+        # Fail the invocation so Lambda retries it from the transform checkpoint
+        if claim_key:
+            ledger.release(claim_key)
+        print(json.dumps({"level": "ERROR", "message": "Processor Lambda out of time", "error": str(e), "correlation_id": correlation_id}))
+        raise
+
     except Exception as e:
+        if claim_key:
+            ledger.release(claim_key)
         error_log = {"status": "error", "message": str(e), "correlation_id": correlation_id}
         print(json.dumps({"level": "ERROR", "message": "Processor Lambda failed", **error_log}))
         return error_log
@@ -6,6 +6,8 @@ from datetime import datetime
 import boto3
 import uuid
 import time
+from idempotency import content_token, get_ledger, idempotency_key
+from deadline import DeadlineExceeded, PhaseRunner
 
 s3 = boto3.client("s3")
 
@@ -14,25 +16,41 @@ TARGET_URL = os.environ.get("TARGET_URL", "https://www.sharesansar.com/today-sha
 
 MAX_RETRIES = 3
 RETRY_DELAY = 2 
+# Minimum time left to start a fetch attempt (request timeout + parsing)
+FETCH_BUDGET_MS = 12000
+
+class ScrapeError(Exception):
+    pass
 
 def lambda_handler(event, context):
     correlation_id = str(uuid.uuid4())
     print(f"[{correlation_id}] Starting scraper Lambda")
 
-    attempt = 0
-    while attempt < MAX_RETRIES:
-        try:
-            response = requests.get(TARGET_URL, timeout=10)
-            response.raise_for_status()
-            break
-        except requests.RequestException as e:
-            attempt += 1
-            print(f"[{correlation_id}] Attempt {attempt} failed: {str(e)}")
-            if attempt >= MAX_RETRIES:
-                return {"status": "error", "message": f"Failed to fetch data after {MAX_RETRIES} attempts"}
-            time.sleep(RETRY_DELAY)
+    ledger = get_ledger()
+    claim_key = None
+    # Checkpoints are scoped to one retry chain: async retries redeliver the
+    # same EventBridge event id, while the next scheduled run gets a new one
+    run_id = event.get("id") or getattr(context, "aws_request_id", correlation_id)
+    runner = PhaseRunner(context, s3, BUCKET_NAME, idempotency_key("scraper", datetime.utcnow().date(), run_id))
+
+    # Fetch and parse the table; the parsed rows are checkpointed so a retry
+    # after a timeout goes straight to the upload
+    def scrape():
+        attempt = 0
+        while attempt < MAX_RETRIES:
+            if runner.remaining_ms() - runner.safety_margin_ms < FETCH_BUDGET_MS:
+                raise DeadlineExceeded(f"No time left for fetch attempt {attempt + 1}")
+            try:
+                response = requests.get(TARGET_URL, timeout=10)
+                response.raise_for_status()
+                break
+            except requests.RequestException as e:
+                attempt += 1
+                print(f"[{correlation_id}] Attempt {attempt} failed: {str(e)}")
+                if attempt >= MAX_RETRIES:
+                    raise ScrapeError(f"Failed to fetch data after {MAX_RETRIES} attempts")
+                time.sleep(RETRY_DELAY)
 
-    try:
         soup = BeautifulSoup(response.text, "html.parser")
         table = soup.find("table", id="headFixed")
         tbody = table.find("tbody")
@@ -52,27 +70,61 @@ def lambda_handler(event, context):
                 all_rows.append(row_data)
 
         if not all_rows:
-            return {"status": "error", "message": "No rows scraped from the table"}
+            raise ScrapeError("No rows scraped from the table")
+        return all_rows
+
+    try:
+        all_rows = runner.run("scrape", scrape, budget_ms=FETCH_BUDGET_MS)
 
-        # Create S3 key with date and timestamp for idempotency
-        timestamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
-        key = f"raw/{datetime.utcnow().date()}/data_{timestamp}.json"
+        # Skip the upload when today's table is identical to one already saved
+        # (retried schedule, or the market has not updated yet)
+        body = json.dumps(all_rows, indent=2)
+        body_hash = content_token(body)
+        claim_key = idempotency_key("scraper", datetime.utcnow().date(), body_hash)
+        claimed, previous = ledger.claim(claim_key, in_progress_seconds=runner.remaining_seconds())
+        if not claimed:
+            claim_key = None
+            runner.clear()
+            print(f"[{correlation_id}] Table unchanged since last scrape, skipping upload")
+            return {"status": "duplicate", "result": previous.get("result"), "correlation_id": correlation_id}
+
+        # Key on date and content hash, so a retry after a failed ledger update
+        # overwrites the same object instead of starting a second pipeline run
+        key = f"raw/{datetime.utcnow().date()}/data_{body_hash}.json"
 
         s3.put_object(
             Bucket=BUCKET_NAME,
             Key=key,
-            Body=json.dumps(all_rows, indent=2),
+            Body=body,
             ContentType="application/json"
         )
 
-        print(f"[{correlation_id}] Scraped {len(all_rows)} rows, saved to s3://{BUCKET_NAME}/{key}")
-        return {
+        result = {
             "status": "success",
             "file": key,
             "records": len(all_rows),
             "correlation_id": correlation_id
         }
+        ledger.complete(claim_key, result)
+        runner.clear()
+
+        print(f"[{correlation_id}] Scraped {len(all_rows)} rows, saved to s3://{BUCKET_NAME}/{key}")
+        return result
+
+    except DeadlineExceeded as e:
+        # Let Lambda retry the event; the retry resumes from the parsed rows
+        if claim_key:
+            ledger.release(claim_key)
+        print(f"[{correlation_id}] Out of time, failing for retry: {str(e)}")
+        raise
 
     except Exception as e:
+        if claim_key:
+            ledger.release(claim_key)
         print(f"[{correlation_id}] Error parsing/saving data: {str(e)}")
+        # No retry follows a returned error, so nothing would resume from the checkpoint
+        try:
+            runner.clear()
+        except Exception as clear_error:
+            print(f"[{correlation_id}] Could not clear checkpoint: {str(clear_error)}")
         return {"status": "error", "message": str(e), "correlation_id": correlation_id}
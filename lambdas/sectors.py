@@ -0,0 +1,105 @@
+"""
+Symbol -> sector / instrument-type index and per-sector rollups.
+
+The index is bundled with the Lambda (sectors.json) and loaded once per
+container into a dict, so tagging a row is a single hash lookup. Symbols not
+in the file fall back to the debenture naming pattern, then to Unclassified.
+"""
+import json
+import os
+import re
+
+SECTORS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sectors.json")
+
+UNCLASSIFIED = "Unclassified"
+MUTUAL_FUND_SECTOR = "Mutual Fund"
+DEBENTURE_SECTOR = "Corporate Debenture"
+
+INSTRUMENT_EQUITY = "equity"
+INSTRUMENT_MUTUAL_FUND = "mutual_fund"
+INSTRUMENT_DEBENTURE = "debenture"
+INSTRUMENT_PROMOTER_SHARE = "promoter_share"
+
+_DEBENTURE_PATTERN = re.compile(r"^[A-Z]+D\d{2}")
+
+_index = None
+
+
+def load_index(path=SECTORS_FILE):
+    """Build the symbol -> (sector, instrument) map from the bundled file."""
+    with open(path) as f:
+        data = json.load(f)
+
+    index = {}
+    for sector, symbols in data.get("sectors", {}).items():
+        for symbol in symbols:
+            index[symbol] = (sector, INSTRUMENT_EQUITY)
+    for symbol in data.get("mutual_funds", []):
+        index[symbol] = (MUTUAL_FUND_SECTOR, INSTRUMENT_MUTUAL_FUND)
+    for symbol in data.get("debentures", []):
+        index[symbol] = (DEBENTURE_SECTOR, INSTRUMENT_DEBENTURE)
+    for symbol, parent in data.get("promoter_shares", {}).items():
+        sector = index.get(parent, (UNCLASSIFIED, None))[0]
+        index[symbol] = (sector, INSTRUMENT_PROMOTER_SHARE)
+    return index
+
+
+def classify(symbol):
+    """Return (sector, instrument) for a symbol; the index is loaded on first use."""
+    global _index
+    if _index is None:
+        _index = load_index()
+    found = _index.get(symbol)
+    if found:
+        return found
+    if isinstance(symbol, str) and _DEBENTURE_PATTERN.match(symbol):
+        return DEBENTURE_SECTOR, INSTRUMENT_DEBENTURE
+    return UNCLASSIFIED, INSTRUMENT_EQUITY
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class SectorRollup:
+    """Accumulates per-sector turnover, breadth and average change in one pass over the rows."""
+
+    def __init__(self):
+        self._totals = {}
+
+    def add(self, sector, turnover, change):
+        t = self._totals.setdefault(sector, {
+            "count": 0, "turnover": 0.0, "advancers": 0, "decliners": 0, "unchanged": 0,
+            "change_sum": 0.0, "change_count": 0
+        })
+        t["count"] += 1
+        turnover = _to_float(turnover)
+        if turnover is not None:
+            t["turnover"] += turnover
+        change = _to_float(change)
+        if change is not None:
+            t["change_sum"] += change
+            t["change_count"] += 1
+            if change > 0:
+                t["advancers"] += 1
+            elif change < 0:
+                t["decliners"] += 1
+            else:
+                t["unchanged"] += 1
+
+    def summary(self):
+        """Per-sector figures, largest turnover first."""
+        out = {}
+        for sector, t in sorted(self._totals.items(), key=lambda kv: kv[1]["turnover"], reverse=True):
+            out[sector] = {
+                "count": t["count"],
+                "turnover": round(t["turnover"], 2),
+                "advancers": t["advancers"],
+                "decliners": t["decliners"],
+                "unchanged": t["unchanged"],
+                "avg_change": round(t["change_sum"] / t["change_count"], 2) if t["change_count"] else None
+            }
+        return out
@@ -14,3 +14,25 @@ resource "aws_dynamodb_table" "llm_analysis" {
     ManagedBy = "terraform"
   }
 }
+
+# --- Idempotency ledger shared by all pipeline stages ---
+resource "aws_dynamodb_table" "pipeline_ledger" {
+  name         = "Nepse-Pipeline-Ledger"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "idempotency_key"
+
+  attribute {
+    name = "idempotency_key"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "ttl"
+    enabled        = true
+  }
+
+  tags = {
+    Owner     = "Sujal Phaiju"
+    ManagedBy = "terraform"
+  }
+}
@@ -42,6 +42,50 @@ resource "aws_iam_role_policy" "llm_lambda_dynamo_put" {
           "dynamodb:PutItem"
         ]
         Resource = "*"   # Allows PutItem on all DynamoDB tables
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:PutItem",
+          "dynamodb:GetItem",
+          "dynamodb:UpdateItem",
+          "dynamodb:DeleteItem"
+        ]
+        Resource = aws_dynamodb_table.pipeline_ledger.arn
+      }
+    ]
+  })
+}
+
+# --- Inline Policy for offloading large reports to S3 ---
+resource "aws_iam_role_policy" "llm_lambda_reports_put" {
+  name = "LLMLambdaReportsPut"
+  role = aws_iam_role.llm_lambda_role.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect   = "Allow"
+        Action   = ["s3:PutObject"]
+        Resource = "${aws_s3_bucket.market.arn}/reports/*"
+      }
+    ]
+  })
+}
+
+# --- Inline Policy for phase checkpoints ---
+resource "aws_iam_role_policy" "llm_lambda_checkpoints_rw" {
+  name = "LLMLambdaCheckpointsReadWrite"
+  role = aws_iam_role.llm_lambda_role.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect   = "Allow"
+        Action   = ["s3:PutObject", "s3:DeleteObject"]
+        Resource = "${aws_s3_bucket.market.arn}/checkpoints/*"
       }
     ]
   })
@@ -77,8 +121,27 @@ resource "aws_iam_role_policy_attachment" "llm_lambda_eventbridge" {
 # --- LLM Lambda Function ---
 data "archive_file" "llm_analysis_zip" {
   type        = "zip"
-  source_file = "${var.lambda_src_path}/llm_analysis_lambda.py"
   output_path = "${path.module}/../build/llm_analysis_lambda.zip"
+
+  source {
+    content  = file("${var.lambda_src_path}/llm_analysis_lambda.py")
+    filename = "llm_analysis_lambda.py"
+  }
+
+  source {
+    content  = file("${var.lambda_src_path}/json_stream.py")
+    filename = "json_stream.py"
+  }
+
+  source {
+    content  = file("${var.lambda_src_path}/idempotency.py")
+    filename = "idempotency.py"
+  }
+
+  source {
+    content  = file("${var.lambda_src_path}/deadline.py")
+    filename = "deadline.py"
+  }
 }
 
 resource "aws_lambda_function" "llm_analysis" {
@@ -93,10 +156,12 @@ resource "aws_lambda_function" "llm_analysis" {
 
   environment {
     variables = {
-      BUCKET_NAME     = aws_s3_bucket.market.bucket
-      DYNAMO_TABLE    = aws_dynamodb_table.llm_analysis.name
-      LLM_MODEL       = "amazon.nova-lite-v1:0"
-      ALERT_EVENT_BUS = "default"
+      BUCKET_NAME            = aws_s3_bucket.market.bucket
+      DYNAMO_TABLE           = aws_dynamodb_table.llm_analysis.name
+      LLM_MODEL              = "amazon.nova-lite-v1:0"
+      ALERT_EVENT_BUS        = "default"
+      EVENT_DETAIL_MAX_BYTES = 65536
+      LEDGER_TABLE           = aws_dynamodb_table.pipeline_ledger.name
     }
   }
 
@@ -23,11 +23,59 @@ resource "aws_iam_role_policy_attachment" "notifier_lambda_basic" {
   policy_arn = "arn:aws:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole"
 }
 
+# Read offloaded reports referenced by claim-check events
+resource "aws_iam_role_policy" "notifier_reports_get" {
+  name = "NotifierReportsGet"
+  role = aws_iam_role.notifier_lambda_role.id
+
+  policy = jsonencode({
+    Version = "2012-10-17",
+    Statement = [
+      {
+        Effect   = "Allow"
+        Action   = ["s3:GetObject"]
+        Resource = "${aws_s3_bucket.market.arn}/reports/*"
+      }
+    ]
+  })
+}
+
+# Idempotency ledger read/write
+resource "aws_iam_role_policy" "notifier_ledger_rw" {
+  name = "NotifierLedgerReadWrite"
+  role = aws_iam_role.notifier_lambda_role.id
+
+  policy = jsonencode({
+    Version = "2012-10-17",
+    Statement = [
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:PutItem",
+          "dynamodb:GetItem",
+          "dynamodb:UpdateItem",
+          "dynamodb:DeleteItem"
+        ]
+        Resource = aws_dynamodb_table.pipeline_ledger.arn
+      }
+    ]
+  })
+}
+
 # ---------- Notifier Lambda ----------
 data "archive_file" "notifier_zip" {
   type        = "zip"
-  source_file = "${var.lambda_src_path}/notifier_lambda.py"
   output_path = "${path.module}/../build/notifier_lambda.zip"
+
+  source {
+    content  = file("${var.lambda_src_path}/notifier_lambda.py")
+    filename = "notifier_lambda.py"
+  }
+
+  source {
+    content  = file("${var.lambda_src_path}/idempotency.py")
+    filename = "idempotency.py"
+  }
 }
 
 resource "aws_lambda_function" "notifier_lambda" {
@@ -44,6 +92,8 @@ resource "aws_lambda_function" "notifier_lambda" {
     variables = {
       SES_EMAIL_FROM = var.ses_email_from
       SES_EMAIL_TO   = var.ses_email_to
+      BUCKET_NAME    = aws_s3_bucket.market.bucket
+      LEDGER_TABLE   = aws_dynamodb_table.pipeline_ledger.name
     }
   }
 
@@ -50,6 +50,34 @@ resource "aws_s3_bucket_lifecycle_configuration" "market" {
     }
   }
 
+  # --- Delete offloaded 'reports/' once notified ---
+  rule {
+    id     = "delete-reports"
+    status = "Enabled"
+
+    filter {
+      prefix = "reports/"
+    }
+
+    expiration {
+      days = 30
+    }
+  }
+
+  # --- Delete leftover phase 'checkpoints/' ---
+  rule {
+    id     = "delete-checkpoints"
+    status = "Enabled"
+
+    filter {
+      prefix = "checkpoints/"
+    }
+
+    expiration {
+      days = 7
+    }
+  }
+
   # --- Move 'processed/' to Glacier and delete later ---
   rule {
     id     = "processed-to-glacier"
@@ -34,7 +34,8 @@ resource "aws_iam_role_policy" "lambda_s3_rw" {
           "s3:GetObject",
           "s3:PutObject",
           "s3:DeleteObject",
-          "s3:ListBucket"
+          "s3:ListBucket",
+          "s3:AbortMultipartUpload"
         ]
         Resource = [
           "arn:aws:s3:::*",
@@ -45,6 +46,28 @@ resource "aws_iam_role_policy" "lambda_s3_rw" {
   })
 }
 
+# Idempotency ledger read/write
+resource "aws_iam_role_policy" "lambda_ledger_rw" {
+  name = "LambdaLedgerReadWrite"
+  role = aws_iam_role.lambda_role.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:PutItem",
+          "dynamodb:GetItem",
+          "dynamodb:UpdateItem",
+          "dynamodb:DeleteItem"
+        ]
+        Resource = aws_dynamodb_table.pipeline_ledger.arn
+      }
+    ]
+  })
+}
+
 # resource "aws_iam_role_policy_attachment" "lambda_s3" {
 #   role       = aws_iam_role.lambda_role.name
 #   policy_arn = "arn:aws:iam::aws:policy/AmazonS3FullAccess"
@@ -53,8 +76,22 @@ resource "aws_iam_role_policy" "lambda_s3_rw" {
 # --- Scraper Lambda ---
 data "archive_file" "scraper_zip" {
   type        = "zip"
-  source_file = "${var.lambda_src_path}/scraper_lambda.py"
   output_path = "${path.module}/../build/scraper_lambda.zip"
+
+  source {
+    content  = file("${var.lambda_src_path}/scraper_lambda.py")
+    filename = "scraper_lambda.py"
+  }
+
+  source {
+    content  = file("${var.lambda_src_path}/idempotency.py")
+    filename = "idempotency.py"
+  }
+
+  source {
+    content  = file("${var.lambda_src_path}/deadline.py")
+    filename = "deadline.py"
+  }
 }
 
 resource "aws_lambda_function" "scraper" {
@@ -71,8 +108,9 @@ resource "aws_lambda_function" "scraper" {
 
   environment {
     variables = {
-      BUCKET_NAME = aws_s3_bucket.market.bucket
-      TARGET_URL  = var.target_url
+      BUCKET_NAME  = aws_s3_bucket.market.bucket
+      TARGET_URL   = var.target_url
+      LEDGER_TABLE = aws_dynamodb_table.pipeline_ledger.name
     }
   }
 
@@ -119,8 +157,37 @@ resource "aws_lambda_permission" "allow_eventbridge_scraper" {
 # --- Processor Lambda ---
 data "archive_file" "processor_zip" {
   type        = "zip"
-  source_file = "${var.lambda_src_path}/processor_lambda.py"
   output_path = "${path.module}/../build/processor_lambda.zip"
+
+  source {
+    content  = file("${var.lambda_src_path}/processor_lambda.py")
+    filename = "processor_lambda.py"
+  }
+
+  source {
+    content  = file("${var.lambda_src_path}/sectors.py")
+    filename = "sectors.py"
+  }
+
+  source {
+    content  = file("${var.lambda_src_path}/sectors.json")
+    filename = "sectors.json"
+  }
+
+  source {
+    content  = file("${var.lambda_src_path}/json_stream.py")
+    filename = "json_stream.py"
+  }
+
+  source {
+    content  = file("${var.lambda_src_path}/idempotency.py")
+    filename = "idempotency.py"
+  }
+
+  source {
+    content  = file("${var.lambda_src_path}/deadline.py")
+    filename = "deadline.py"
+  }
 }
 
 resource "aws_lambda_function" "processor" {
@@ -135,7 +202,8 @@ resource "aws_lambda_function" "processor" {
 
   environment {
     variables = {
-      BUCKET_NAME = aws_s3_bucket.market.bucket
+      BUCKET_NAME  = aws_s3_bucket.market.bucket
+      LEDGER_TABLE = aws_dynamodb_table.pipeline_ledger.name
     }
   }
 
@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+# Lambdas import their shared helpers (e.g. json_stream) as top-level modules,
+# the same way they are packaged in the deployment zips
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), "lambdas"))
+# The in-memory S3 fake is shared with the load test
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), "bench"))
+
+from memory_s3 import MemoryS3
+
+
+@pytest.fixture
+def memory_s3():
+    return MemoryS3()
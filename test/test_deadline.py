@@ -0,0 +1,109 @@
+import io
+import json
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+os.environ.setdefault("BUCKET_NAME", "dummy-bucket")
+os.environ.setdefault("DYNAMO_TABLE", "dummy-table")
+
+import pytest
+from lambdas import deadline, idempotency, llm_analysis_lambda, processor_lambda
+from unittest.mock import MagicMock
+
+# Captured at import: test_llm_analysis_lambda_simple swaps the module attribute for a mock
+LLM_HANDLER = llm_analysis_lambda.lambda_handler
+PROCESSOR_HANDLER = processor_lambda.lambda_handler
+
+
+def _fake_s3(store):
+    s3 = MagicMock()
+    s3.list_objects_v2.side_effect = lambda Bucket, Prefix: {
+        "Contents": [{"Key": k} for k in store if k.startswith(Prefix)]
+    }
+    s3.get_object.side_effect = lambda Bucket, Key: {"Body": io.BytesIO(store[Key].encode())}
+    s3.put_object.side_effect = lambda Bucket, Key, Body, ContentType: store.__setitem__(Key, Body)
+    return s3
+
+
+def test_phase_runner_resumes_from_checkpoint_after_deadline():
+    store = {}
+    context = MagicMock()
+    context.get_remaining_time_in_millis.return_value = 10000
+    prepare, analyse = MagicMock(return_value={"prompt": "p"}), MagicMock(return_value="text")
+
+    # First attempt: prepare runs, but too little time is left for the slow phase
+    runner = deadline.PhaseRunner(context, _fake_s3(store), "bucket", "llm_analysis#processed/x.json#abc")
+    assert runner.run("prepare", prepare, budget_ms=1000) == {"prompt": "p"}
+    with pytest.raises(deadline.DeadlineExceeded):
+        runner.run("analyse", analyse, budget_ms=30000)
+    assert "checkpoints/llm_analysis/processed/x.json/abc/prepare.json" in store
+
+    # Retry: prepare is loaded from its checkpoint, only analyse runs
+    context.get_remaining_time_in_millis.return_value = 60000
+    runner = deadline.PhaseRunner(context, _fake_s3(store), "bucket", "llm_analysis#processed/x.json#abc")
+    assert runner.run("prepare", prepare, budget_ms=1000) == {"prompt": "p"}
+    assert runner.run("analyse", analyse, budget_ms=30000) == "text"
+    assert prepare.call_count == 1
+    assert analyse.call_count == 1
+
+
+def test_llm_analysis_fails_for_retry_and_resumes_from_checkpoint(monkeypatch, memory_s3):
+    ledger = idempotency.LocalLedger()
+    bedrock = MagicMock()
+    bedrock.invoke_model.return_value = {"body": io.BytesIO(json.dumps(
+        {"output": {"message": {"content": [{"text": "MARKET SUMMARY\nQuiet session.\n"}]}}}
+    ).encode())}
+    format_rows = MagicMock(side_effect=llm_analysis_lambda._format_rows)
+    for name, value in {"s3": memory_s3, "bedrock": bedrock, "dynamodb": MagicMock(), "events": MagicMock(),
+                        "get_ledger": lambda: ledger, "_format_rows": format_rows}.items():
+        monkeypatch.setattr(llm_analysis_lambda, name, value)
+    memory_s3.put_object(Bucket="", Key="processed/2025-09-17/data.json", Body=json.dumps([{"Symbol": "NABIL"}]))
+    memory_s3.put_object(Bucket="", Key="metadata/2025-09-17/data_meta.json", Body=json.dumps({"raw_count": 1}))
+    event = {"Records": [{"s3": {"object": {"key": "processed/2025-09-17/data.json"}}}]}
+    context = MagicMock(aws_request_id="req-1")
+
+    # First attempt: the prompt is built, but too little time is left for Bedrock
+    context.get_remaining_time_in_millis.return_value = 10000
+    with pytest.raises(llm_analysis_lambda.DeadlineExceeded):
+        LLM_HANDLER(event, context)
+    assert ledger.records == {}
+    bedrock.invoke_model.assert_not_called()
+
+    # Lambda's retry reuses the checkpointed prompt and cleans up on success
+    context.get_remaining_time_in_millis.return_value = 60000
+    result = LLM_HANDLER(event, context)
+    assert result["status"] == "success"
+    format_rows.assert_called_once()
+    bedrock.invoke_model.assert_called_once()
+    assert not [k for k in memory_s3.objects if k.startswith("checkpoints/")]
+
+
+def test_processor_publishes_processed_file_only_after_metadata(monkeypatch, memory_s3):
+    ledger = idempotency.LocalLedger()
+    monkeypatch.setattr(processor_lambda, "s3", memory_s3)
+    monkeypatch.setattr(processor_lambda, "get_ledger", lambda: ledger)
+    row = [0.0] * 24
+    row[1], row[6] = "NABIL", 500.0
+    memory_s3.put_object(Bucket="", Key="raw/2025-09-17/data.json", Body=json.dumps([row]))
+    event = {"Records": [{"s3": {"object": {"key": "raw/2025-09-17/data.json"}}}]}
+    context = MagicMock()
+    context.get_remaining_time_in_millis.return_value = 60000
+
+    # First attempt dies after the transform phase, before the metadata is saved
+    put_object = memory_s3.put_object
+
+    def failing_put(Bucket, Key, Body, ContentType=None):
+        if Key.startswith("metadata/"):
+            raise RuntimeError("killed")
+        put_object(Bucket=Bucket, Key=Key, Body=Body, ContentType=ContentType)
+
+    monkeypatch.setattr(memory_s3, "put_object", failing_put)
+    assert PROCESSOR_HANDLER(event, context)["status"] == "error"
+    assert not [k for k in memory_s3.objects if k.startswith("processed/")]
+
+    # The retry resumes from the checkpoint and publishes the staged rows
+    monkeypatch.setattr(memory_s3, "put_object", put_object)
+    result = PROCESSOR_HANDLER(event, context)
+    assert json.loads(memory_s3.objects[result["processed_file"]])[0]["Symbol"] == "NABIL"
+    assert [k for k in memory_s3.objects if k.startswith("metadata/")]
+    assert not [k for k in memory_s3.objects if k.startswith("checkpoints/")]
@@ -0,0 +1,62 @@
+import json
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+os.environ.setdefault("BUCKET_NAME", "dummy-bucket")
+
+from lambdas import idempotency, processor_lambda
+from unittest.mock import MagicMock
+
+# Captured at import: test_processor_lambda_simple swaps the module attribute for a mock
+PROCESSOR_HANDLER = processor_lambda.lambda_handler
+
+
+def _raw_row(symbol, close):
+    row = [0.0] * 24
+    row[1], row[6], row[13], row[17] = symbol, close, 1000.0, 1.5
+    return row
+
+
+def test_local_ledger_short_circuits_completed_work():
+    ledger = idempotency.LocalLedger()
+    key = idempotency.idempotency_key("processor", "raw/2025-09-17/data.json", idempotency.content_token('"abc"'))
+
+    assert ledger.claim(key, now=0) == (True, None)
+    assert ledger.claim(key, now=1) == (False, {"status": "IN_PROGRESS"})
+
+    ledger.complete(key, {"processed_count": 281})
+    assert ledger.claim(key, now=2) == (False, {"status": "COMPLETED", "result": {"processed_count": 281}})
+
+
+def test_local_ledger_allows_retry_after_release_or_expiry():
+    ledger = idempotency.LocalLedger()
+
+    assert ledger.claim("llm#a", now=0)[0]
+    ledger.release("llm#a")
+    assert ledger.claim("llm#a", now=0)[0]
+
+    assert ledger.claim("llm#a", now=idempotency.IN_PROGRESS_SECONDS + 1)[0]
+
+
+def test_content_token_ignores_etag_quotes():
+    assert idempotency.content_token('"abc"') == idempotency.content_token("abc")
+
+
+def test_processor_skips_redelivered_raw_file(monkeypatch, memory_s3):
+    monkeypatch.setattr(processor_lambda, "s3", memory_s3)
+    ledger = idempotency.LocalLedger()
+    monkeypatch.setattr(processor_lambda, "get_ledger", lambda: ledger)
+    key = "raw/2025-09-17/data_abc.json"
+    memory_s3.put_object(Bucket="", Key=key, Body=json.dumps([_raw_row("NABIL", 500.0), _raw_row("C30MF", 9.8)]))
+    event = {"Records": [{"s3": {"object": {"key": key}}}]}
+    context = MagicMock()
+    context.get_remaining_time_in_millis.return_value = 60000
+
+    first = PROCESSOR_HANDLER(event, context)
+    puts = len(memory_s3.puts)
+    second = PROCESSOR_HANDLER(event, context)
+
+    assert first["processed_count"] == 1
+    assert second["status"] == "duplicate"
+    assert second["result"]["processed_file"] == first["processed_file"]
+    assert len(memory_s3.puts) == puts
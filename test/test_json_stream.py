@@ -0,0 +1,52 @@
+import io
+import json
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import pytest
+from lambdas import json_stream
+from unittest.mock import MagicMock
+
+
+def test_iter_json_array_matches_json_loads_across_chunk_boundaries():
+    rows = [[1.0, "ADBL", 320.3, None, "नेपाल"], {"Symbol": "NABIL", "Close": 12345.678}, 7, -1.5e3, 0.25, True, []]
+    for text in (json.dumps(rows), json.dumps(rows, indent=2), "[-1.5e3, true, 12.75]"):
+        expected = json.loads(text)
+        for chunk_size in (1, 2, 3, 5):
+            stream = io.BytesIO(text.encode("utf-8"))
+            assert list(json_stream.iter_json_array(stream, chunk_size=chunk_size)) == expected
+
+
+def test_iter_json_array_rejects_non_arrays():
+    with pytest.raises(ValueError):
+        list(json_stream.iter_json_array(io.BytesIO(b'{"a": 1}')))
+    with pytest.raises(ValueError):
+        list(json_stream.iter_json_array(io.BytesIO(b"[1, 2")))
+
+
+def test_writer_switches_to_multipart_for_large_output():
+    s3 = MagicMock()
+    s3.create_multipart_upload.return_value = {"UploadId": "u1"}
+    s3.upload_part.return_value = {"ETag": "e"}
+
+    with json_stream.S3JsonArrayWriter(s3, "bucket", "key", part_size=64) as writer:
+        for i in range(20):
+            writer.write({"Symbol": f"S{i}"})
+
+    body = b"".join(call.kwargs["Body"] for call in s3.upload_part.call_args_list)
+    assert json.loads(body) == [{"Symbol": f"S{i}"} for i in range(20)]
+    s3.complete_multipart_upload.assert_called_once()
+    s3.put_object.assert_not_called()
+
+
+def test_writer_multipart_output_streams_back_from_s3(memory_s3):
+    rows = [{"Symbol": f"S{i}", "Close": i * 1.5} for i in range(50)]
+
+    with json_stream.S3JsonArrayWriter(memory_s3, "bucket", "processed/x.json", part_size=128) as writer:
+        for row in rows:
+            writer.write(row)
+
+    assert memory_s3.puts == ["processed/x.json"]
+    body = memory_s3.get_object(Bucket="bucket", Key="processed/x.json")["Body"]
+    assert list(json_stream.iter_json_array(body, chunk_size=7)) == rows
@@ -24,3 +24,33 @@ def test_llm_analysis_lambda_simple():
 
     assert result["status"] == "success"
     assert "market_summary" in result
+
+
+def test_offload_detail_keeps_small_reports_inline():
+    detail = {"file_key": "processed/2025-09-17/data.json", "anomalies": "Symbol: ABC"}
+    assert llm_analysis_lambda._offload_detail(detail) is detail
+
+
+def test_offload_detail_writes_large_reports_to_s3(monkeypatch):
+    s3 = MagicMock()
+    monkeypatch.setattr(llm_analysis_lambda, "s3", s3)
+    detail = {
+        "file_key": "processed/2025-09-17/data.json",
+        "anomalies": "Symbol: ABC\n" * 10000,
+        "raw_count": 320,
+        "correlation_id": "abc"
+    }
+
+    ref = llm_analysis_lambda._offload_detail(detail)
+
+    assert ref["report_key"] == "reports/2025-09-17/data.json"
+    assert ref["anomaly_count"] == 10000
+    assert "anomalies" not in ref
+    s3.put_object.assert_called_once()
+
+
+def test_format_rows_leaves_sector_to_the_summary():
+    rows = [{"Symbol": "NABIL", "Close": "500.0", "Sector": "Commercial Banks"}]
+    text, count = llm_analysis_lambda._format_rows(iter(rows))
+    assert count == 1
+    assert json.loads(text) == [{"Symbol": "NABIL", "Close": "500.0"}]
@@ -2,9 +2,12 @@ import os
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
-from lambdas import notifier_lambda
+from lambdas import idempotency, notifier_lambda
 from unittest.mock import MagicMock
 
+# Captured at import: test_notifier_lambda_simple swaps the module attribute for a mock
+NOTIFIER_HANDLER = notifier_lambda.lambda_handler
+
 os.environ["SES_EMAIL_FROM"] = "from@example.com"
 os.environ["SES_EMAIL_TO"] = "to@example.com"
 
@@ -20,4 +23,44 @@ def test_notifier_lambda_simple():
 
     assert result["status"] == "success"
 
-# test8
\ No newline at end of file
+# test8
+
+
+def test_resolve_detail_fetches_offloaded_report_once(monkeypatch):
+    notifier_lambda._report_cache.clear()
+    body = MagicMock()
+    body.read.return_value = b'{"file_key": "processed/x.json", "anomalies": "Symbol: ABC"}'
+    s3 = MagicMock()
+    s3.get_object.return_value = {"Body": body}
+    monkeypatch.setattr(notifier_lambda, "s3", s3)
+    detail = {"file_key": "processed/x.json", "report_key": "reports/x.json", "raw_count": 3}
+
+    resolved = notifier_lambda._resolve_detail(detail)
+    notifier_lambda._resolve_detail(detail)
+
+    assert resolved["anomalies"] == "Symbol: ABC"
+    assert resolved["raw_count"] == 3
+    s3.get_object.assert_called_once()
+
+
+def test_notifier_sends_once_and_skips_redelivered_event(monkeypatch):
+    ledger = idempotency.LocalLedger()
+    ledger.claim = MagicMock(wraps=ledger.claim)
+    ses = MagicMock()
+    ses.send_email.return_value = {"MessageId": "m-1"}
+    monkeypatch.setattr(notifier_lambda, "ses", ses)
+    monkeypatch.setattr(notifier_lambda, "get_ledger", lambda: ledger)
+    event = {"detail": {"file_key": "processed/2025-09-17/data.json", "market_summary": "Calm",
+                        "anomalies": "Symbol: ABC, Turnover: 1.0, Price Change: +1.00%, Reason: Test"}}
+    context = MagicMock()
+    context.get_remaining_time_in_millis.return_value = 20000
+
+    first = NOTIFIER_HANDLER(event, context)
+    second = NOTIFIER_HANDLER(event, context)
+
+    assert first == {"status": "success", "message_id": "m-1"}
+    assert second == {"status": "duplicate", "result": {"message_id": "m-1"}}
+    ses.send_email.assert_called_once()
+    # The claim expires with the invocation, not after the 15-minute default
+    assert ledger.claim.call_args.kwargs["in_progress_seconds"] == 20
+
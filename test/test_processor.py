@@ -18,3 +18,63 @@ def test_processor_lambda_simple():
     result = processor_lambda.lambda_handler(event, context)
 
     assert result["processed_count"] > 0
+
+
+def test_classify_rejects_counts_known_and_surfaces_novel():
+    index = {"symbols": {"LUK": {"category": "below_min_price"}}, "known_count": 1}
+    rejects = [
+        {"row": {"Symbol": "C30MF"}, "reason": "low", "category": "below_min_price"},
+        {"row": {"Symbol": "LUK"}, "reason": "low", "category": "below_min_price"},
+        {"row": {"Symbol": "NEWCO"}, "reason": "low", "category": "below_min_price"},
+        {"row": [1.0, "BAD"], "reason": "list index out of range", "category": "malformed"},
+    ]
+
+    novel, summary = processor_lambda._classify_rejects(rejects, index, "2025-09-17")
+
+    assert [r["reason"] for r in novel] == ["low", "list index out of range"]
+    assert summary == {"count": 2, "delta": 1, "by_category": {"below_min_price": 2}}
+    assert index["symbols"]["NEWCO"]["instrument"] == "unknown"
+
+    # Second run: an unknown instrument keeps being surfaced, not silently counted
+    novel, summary = processor_lambda._classify_rejects(rejects[:3], index, "2025-09-18")
+    assert novel == [rejects[2]]
+    assert summary["delta"] == 0
+    assert index["symbols"]["NEWCO"]["first_seen"] == "2025-09-17"
+
+
+def test_mutual_fund_pattern_requires_scheme_suffix():
+    pattern = dict(processor_lambda.KNOWN_REJECT_PATTERNS)["mutual_fund"]
+    assert all(pattern.match(s) for s in ["C30MF", "CMF2", "NICSF", "NBF2", "LVF2", "GBIMESY2"])
+    assert not any(pattern.match(s) for s in ["NMBMF", "SWMF", "NIFRA", "CHDC"])
+
+
+def test_classify_rejects_surfaces_indexed_equities_despite_fund_like_symbol():
+    # NMBMF is a microfinance company in sectors.json, not a mutual fund
+    rejects = [{"row": {"Symbol": "NMBMF"}, "reason": "Close price 0.0 < 20", "category": "below_min_price"}]
+    index = {}
+
+    for day in ("2025-09-17", "2025-09-18"):
+        novel, summary = processor_lambda._classify_rejects(rejects, index, day)
+        assert novel == rejects
+        assert summary["count"] == 0
+    assert index["symbols"]["NMBMF"]["instrument"] == "equity"
+
+
+def test_classify_rejects_reclassifies_symbols_already_in_the_index():
+    # Entry persisted before NMBMF was recognised as an equity
+    index = {"symbols": {"NMBMF": {"category": "below_min_price", "instrument": "mutual_fund", "first_seen": "2025-09-01"}}}
+    rejects = [{"row": {"Symbol": "NMBMF"}, "reason": "low", "category": "below_min_price"}]
+
+    novel, summary = processor_lambda._classify_rejects(rejects, index, "2025-09-17")
+
+    assert novel == rejects
+    assert summary["count"] == 0
+    assert index["symbols"]["NMBMF"] == {"category": "below_min_price", "instrument": "equity", "first_seen": "2025-09-17"}
+
+
+def test_classify_rejects_counts_unindexed_debentures_via_sectors():
+    rejects = [{"row": {"Symbol": "XYZD89"}, "reason": "low", "category": "below_min_price"}]
+    index = {}
+    novel, summary = processor_lambda._classify_rejects(rejects, index, "2025-09-17")
+    assert novel == []
+    assert index["symbols"]["XYZD89"]["instrument"] == "debenture"
@@ -0,0 +1,88 @@
+import json
+import os
+import sys
+import types
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+os.environ.setdefault("BUCKET_NAME", "dummy-bucket")
+
+import pytest
+from unittest.mock import MagicMock
+
+# requests / bs4 ship in the scraper's layer; stand-ins let the handler import without them
+try:
+    import requests  # noqa: F401
+except ImportError:
+    sys.modules["requests"] = types.SimpleNamespace(RequestException=Exception, get=None)
+try:
+    import bs4  # noqa: F401
+except ImportError:
+    sys.modules["bs4"] = types.SimpleNamespace(BeautifulSoup=None)
+
+from lambdas import idempotency, scraper_lambda
+
+
+class _Node:
+    """Just enough of a BeautifulSoup tag for the scraper's table walk."""
+
+    def __init__(self, children=(), text=""):
+        self.children = list(children)
+        self.text = text
+
+    def find(self, name, **attrs):
+        return self.children[0]
+
+    def find_all(self, name):
+        return self.children
+
+    def get_text(self, strip=False):
+        return self.text
+
+
+def _soup(html, parser):
+    # The fake page is the table rows as JSON
+    rows = [_Node([_Node(text=str(cell)) for cell in row]) for row in json.loads(html)]
+    return _Node([_Node([_Node(rows)])])
+
+
+@pytest.fixture
+def scraper(monkeypatch, memory_s3):
+    ledger = idempotency.LocalLedger()
+    monkeypatch.setattr(scraper_lambda, "s3", memory_s3)
+    monkeypatch.setattr(scraper_lambda, "get_ledger", lambda: ledger)
+    monkeypatch.setattr(scraper_lambda, "BeautifulSoup", _soup)
+    page = json.dumps([["1", "NABIL", "500.0"], ["2", "C30MF", "9.8"]])
+    monkeypatch.setattr(scraper_lambda.requests, "get", MagicMock(return_value=MagicMock(text=page)))
+    context = MagicMock()
+    context.get_remaining_time_in_millis.return_value = 60000
+    return memory_s3, context
+
+
+def test_scraper_skips_unchanged_table(scraper):
+    s3, context = scraper
+
+    first = scraper_lambda.lambda_handler({"id": "event-1"}, context)
+    second = scraper_lambda.lambda_handler({"id": "event-2"}, context)
+
+    assert first["status"] == "success"
+    assert json.loads(s3.objects[first["file"]]) == [[1.0, "NABIL", 500.0], [2.0, "C30MF", 9.8]]
+    assert second["status"] == "duplicate"
+    assert [k for k in s3.puts if k.startswith("raw/")] == [first["file"]]
+    assert not [k for k in s3.objects if k.startswith("checkpoints/")]
+
+
+def test_scraper_clears_checkpoint_when_upload_fails(scraper, monkeypatch):
+    s3, context = scraper
+    put_object = s3.put_object
+
+    def failing_put(Bucket, Key, Body, ContentType=None):
+        if Key.startswith("raw/"):
+            raise RuntimeError("S3 unavailable")
+        put_object(Bucket=Bucket, Key=Key, Body=Body, ContentType=ContentType)
+
+    monkeypatch.setattr(s3, "put_object", failing_put)
+
+    result = scraper_lambda.lambda_handler({"id": "event-1"}, context)
+
+    assert result["status"] == "error"
+    assert any(k.startswith("checkpoints/") for k in s3.puts)
+    assert not [k for k in s3.objects if k.startswith("checkpoints/")]
@@ -0,0 +1,29 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from lambdas import sectors
+
+
+def test_classify_uses_bundled_index_and_fallbacks():
+    assert sectors.classify("NABIL") == ("Commercial Banks", "equity")
+    assert sectors.classify("HIDCLP") == ("Investment", "promoter_share")
+    assert sectors.classify("LUK") == ("Mutual Fund", "mutual_fund")
+    assert sectors.classify("NABILD87") == ("Corporate Debenture", "debenture")
+    assert sectors.classify("NEWCO") == ("Unclassified", "equity")
+
+
+def test_sector_rollup_turnover_breadth_and_average_change():
+    rollup = sectors.SectorRollup()
+    rollup.add("Hydro Power", 100.0, 2.0)
+    rollup.add("Hydro Power", 50.0, -1.0)
+    rollup.add("Hydro Power", "bad", 0.0)
+    rollup.add("Commercial Banks", 500.0, "N/A")
+
+    summary = rollup.summary()
+
+    assert list(summary) == ["Commercial Banks", "Hydro Power"]
+    assert summary["Hydro Power"] == {
+        "count": 3, "turnover": 150.0, "advancers": 1, "decliners": 1, "unchanged": 1, "avg_change": 0.33
+    }
+    assert summary["Commercial Banks"]["avg_change"] is None
@@ -0,0 +1,25 @@
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), "bench"))
+
+import synthetic_data
+
+
+def test_generate_days_is_seeded_and_matches_raw_layout():
+    first = list(synthetic_data.generate_days(n_symbols=100, days=2, seed=7))
+    again = list(synthetic_data.generate_days(n_symbols=100, days=2, seed=7))
+
+    assert first == again
+    for _, rows in first:
+        assert len(rows) == 100
+        assert all(len(row) == len(synthetic_data.HEADERS) == 24 for row in rows)
+    # Mutual funds trade below the processor's MIN_STOCK_PRICE
+    assert any(row[6] < 20 for row in first[0][1])
+
+
+def test_adversarial_knobs_truncate_rows_and_inject_garbage():
+    _, rows = next(synthetic_data.generate_days(n_symbols=500, seed=1, missing_rate=0.2, garbage_rate=0.2))
+
+    assert any(len(row) < 24 for row in rows)
+    assert any(isinstance(cell, str) for row in rows for cell in row[2:])
+    assert 'id="headFixed"' in synthetic_data.render_html(rows)